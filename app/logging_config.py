@@ -0,0 +1,128 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import random
+from typing import Dict, List, Optional, Tuple
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class SamplingFilter(logging.Filter):
+
+    def __init__(self, rates: List[Tuple[str, float]], hot_rate: float):
+        super().__init__()
+        self.rates = sorted(rates, key=lambda item: -len(item[0]))
+        self.hot_rate = hot_rate
+        self._cache: Dict[str, float] = {}
+        self.dropped = 0
+
+    def rate_for(self, name: str) -> float:
+        rate = self._cache.get(name)
+        if rate is None:
+            rate = next(
+                (value for prefix, value in self.rates if name == prefix or name.startswith(prefix + ".")),
+                self.hot_rate if name.endswith(".hot") else 1.0
+            )
+            self._cache[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO:
+            return True
+        rate = self.rate_for(record.name)
+        if rate >= 1.0 or random.random() < rate:
+            return True
+        self.dropped += 1
+        return False
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_sample_rates(value: str) -> List[Tuple[str, float]]:
+    rates = []
+    for item in value.split(","):
+        if "=" not in item:
+            continue
+        name, rate = item.split("=", 1)
+        rates.append((name.strip(), min(1.0, max(0.0, float(rate)))))
+    return rates
+
+
+def setup_logging():
+    global _listener
+    if _listener is not None:
+        return
+
+    level = getattr(logging, os.getenv("LOG_LEVEL", "INFO").upper(), logging.INFO)
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers: List[logging.Handler] = [logging.StreamHandler()]
+
+    log_file = os.getenv("LOG_FILE", "ltm.log")
+    if log_file:
+        directory = os.path.dirname(log_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        handlers.append(logging.handlers.RotatingFileHandler(
+            log_file,
+            maxBytes=int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024)),
+            backupCount=int(os.getenv("LOG_BACKUP_COUNT", 5)),
+            encoding="utf-8"
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: queue.Queue = queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", 10000)))
+    queue_handler = LazyQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(
+        parse_sample_rates(os.getenv("LOG_SAMPLE_RATES", "")),
+        float(os.getenv("LOG_HOT_SAMPLE_RATE", 0.01))
+    ))
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def get_stats() -> Dict[str, int]:
+    stats = {"queued": 0, "dropped_full": 0, "dropped_sampled": 0}
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, LazyQueueHandler):
+            stats["queued"] = handler.queue.qsize()
+            stats["dropped_full"] = handler.dropped
+            for log_filter in handler.filters:
+                if isinstance(log_filter, SamplingFilter):
+                    stats["dropped_sampled"] = log_filter.dropped
+    return stats
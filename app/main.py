@@ -1,14 +1,27 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, File, Form, HTTPException, Query, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse, Response, StreamingResponse
+from typing import List, Optional
+import asyncio
+import logging
+import re
 import uvicorn
 import os
+from urllib.parse import quote
+import orjson
 from dotenv import load_dotenv
 
-from .services.memory_service import MemoryService, FaceService
-from .models.schemas import MemoryCreate, MemorySearch, MemoryResponse, FaceAddRequest, FaceAddResponse, FaceFindRequest, FaceFindResponse
+from .services.memory_service import MemoryService
+from .services.face_service import FaceService
+from .services import metrics
+from . import logging_config
+from .models.schemas import MemoryCreate, MemoryBatchCreate, MemoryBatchResponse, MemorySearch, MemoryBatchSearch, MemoryResponse, MemorySearchGroup, MemoryListResponse, MemoryImportResponse, FaceAddRequest, FaceAddResponse, FaceFindRequest, FaceFindResponse
 
 load_dotenv()
+logging_config.setup_logging()
+metrics.REGISTRY.configure()
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title="Long Term Memory API",
@@ -23,18 +36,73 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if metrics.REGISTRY.enabled:
+    app.add_middleware(metrics.MetricsMiddleware)
+
 memory_service = MemoryService()
 face_service = FaceService()
+metrics.REGISTRY.add_collector(memory_service.collect_metrics)
+startup_task: Optional[asyncio.Task] = None
+
+async def _initialize_in_background():
+    attempts = int(os.getenv("STARTUP_MAX_ATTEMPTS", 5))
+    delay = float(os.getenv("STARTUP_RETRY_DELAY", 2))
+    for attempt in range(1, attempts + 1):
+        try:
+            await memory_service.initialize()
+            return
+        except Exception:
+            logger.exception(f"Попытка инициализации {attempt}/{attempts} не удалась")
+        if attempt < attempts:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60)
+    logger.critical(f"Сервис не инициализирован за {attempts} попыток, завершаю процесс для перезапуска")
+    logging_config.shutdown_logging()
+    os._exit(1)
 
 @app.on_event("startup")
 async def startup_event():
-    await memory_service.initialize()
+    global startup_task
+    if os.getenv("BACKGROUND_STARTUP", "true").lower() == "true":
+        startup_task = asyncio.create_task(_initialize_in_background())
+    else:
+        await memory_service.initialize()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if startup_task is not None and not startup_task.done():
+        startup_task.cancel()
+        try:
+            await startup_task
+        except asyncio.CancelledError:
+            pass
+    await memory_service.close()
+    face_service.close()
 
 @app.get("/", tags=["Health"])
 async def root():
     return {"message": "Long Term Memory API работает!", "status": "healthy"}
 
-@app.post("/memory/store", response_model=dict, tags=["Memory"])
+@app.get("/ready", tags=["Health"])
+async def ready():
+    readiness = memory_service.get_readiness()
+    return JSONResponse(status_code=200 if readiness["ready"] else 503, content=readiness)
+
+async def require_ready():
+    if not memory_service.initialized:
+        raise HTTPException(status_code=503, detail=f"Сервис еще не готов: {memory_service.phase}")
+
+@app.get("/metrics", tags=["Health"])
+async def metrics_endpoint():
+    if not metrics.REGISTRY.enabled:
+        raise HTTPException(status_code=404, detail="Метрики отключены")
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/stats", tags=["Health"])
+async def stats():
+    return {**memory_service.get_stats(), "logging": logging_config.get_stats()}
+
+@app.post("/memory/store", response_model=dict, tags=["Memory"], dependencies=[Depends(require_ready)])
 async def store_memory(memory: MemoryCreate):
     try:
         result = await memory_service.store_memory(
@@ -42,28 +110,113 @@ async def store_memory(memory: MemoryCreate):
             content=memory.content,
             context=memory.context
         )
-        return {
+        return ORJSONResponse({
             "status": "success",
             "message": "Память успешно сохранена",
             "memory_id": result["id"],
             "user_id": memory.user_id
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка при сохранении памяти: {str(e)}")
 
-@app.post("/search", response_model=List[MemoryResponse])
+@app.post("/memory/store_batch", response_model=MemoryBatchResponse, tags=["Memory"], dependencies=[Depends(require_ready)])
+async def store_memory_batch(batch: MemoryBatchCreate):
+    try:
+        items = await memory_service.store_memories(
+            items=batch.items,
+            wait=batch.wait,
+            chunk_size=batch.chunk_size
+        )
+        failed = sum(1 for item in items if item.status != "success")
+        response = MemoryBatchResponse(
+            status="success" if failed == 0 else ("partial" if failed < len(items) else "error"),
+            stored=len(items) - failed,
+            failed=failed,
+            items=items
+        )
+        return Response(content=response.model_dump_json(), media_type="application/json")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка при пакетном сохранении памяти: {str(e)}")
+
+@app.get("/memory/list", response_model=MemoryListResponse, tags=["Memory"], dependencies=[Depends(require_ready)])
+async def list_memories(
+    user_id: str = Query(..., min_length=1),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    include_vectors: bool = False
+):
+    try:
+        return await memory_service.list_memories(
+            user_id=user_id,
+            limit=limit,
+            cursor=cursor,
+            include_vectors=include_vectors
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка при получении списка воспоминаний: {str(e)}")
+
+@app.get("/memory/export", tags=["Memory"], dependencies=[Depends(require_ready)])
+async def export_memories(
+    user_id: str = Query(..., min_length=1),
+    include_vectors: bool = False
+):
+    async def render():
+        async for items in memory_service.export_memories(user_id=user_id, include_vectors=include_vectors):
+            yield b"".join(
+                orjson.dumps(item, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_SERIALIZE_NUMPY)
+                for item in items
+            )
+
+    filename = f"memories_{user_id}.ndjson"
+    ascii_filename = re.sub(r"[^A-Za-z0-9._-]", "_", filename)
+    return StreamingResponse(
+        render(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f"attachment; filename=\"{ascii_filename}\"; filename*=UTF-8''{quote(filename)}"}
+    )
+
+@app.post("/memory/import", response_model=MemoryImportResponse, tags=["Memory"], dependencies=[Depends(require_ready)])
+async def import_memories(
+    request: Request,
+    user_id: Optional[str] = None,
+    batch_size: int = Query(256, ge=1, le=5000),
+    wait: bool = True
+):
+    try:
+        return await memory_service.import_memories(
+            chunks=request.stream(),
+            user_id=user_id,
+            batch_size=batch_size,
+            wait=wait
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка при импорте воспоминаний: {str(e)}")
+
+@app.post("/search", response_model=List[MemoryResponse], dependencies=[Depends(require_ready)])
 async def search_memories(search_request: MemorySearch):
     try:
         memories = await memory_service.search_memory(
             user_id=search_request.user_id,
             query=search_request.query,
             limit=search_request.limit,
-            min_score=search_request.min_score
+            min_score=search_request.min_score,
+            as_rows=True,
+            time_from=search_request.time_from,
+            time_to=search_request.time_to,
+            recency_half_life_days=search_request.recency_half_life_days,
+            recency_weight=search_request.recency_weight
         )
-        return memories
+        return ORJSONResponse(memories)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка при поиске воспоминаний: {str(e)}")
 
+@app.post("/search/batch", response_model=List[MemorySearchGroup], dependencies=[Depends(require_ready)])
+async def search_memories_batch(batch: MemoryBatchSearch):
+    try:
+        return ORJSONResponse(await memory_service.search_memories(batch.queries, as_rows=True))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка при пакетном поиске воспоминаний: {str(e)}")
+
 @app.post("/add_face", response_model=FaceAddResponse, tags=["Face"])
 async def add_face(face: FaceAddRequest):
     try:
@@ -93,7 +246,7 @@ async def find_face(request: FaceFindRequest):
             return FaceFindResponse(
                 status="success",
                 message="Лицо найдено",
-                image=result["image"]
+                image=await face_service.get_image_base64(result)
             )
         else:
             return FaceFindResponse(
@@ -104,10 +257,51 @@ async def find_face(request: FaceFindRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка при поиске лица: {str(e)}")
 
+@app.post("/add_face/upload", response_model=FaceAddResponse, tags=["Face"])
+async def add_face_upload(
+    user_id: str = Form(...),
+    name: str = Form(...),
+    image: UploadFile = File(...)
+):
+    try:
+        face_id = await face_service.add_face_stream(
+            user_id=user_id,
+            name=name,
+            source=image.file,
+            media_type=image.content_type
+        )
+        return FaceAddResponse(
+            status="success",
+            message="Лицо успешно добавлено",
+            face_id=face_id,
+            user_id=user_id
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка при добавлении лица: {str(e)}")
+
+@app.post("/find_face/image", tags=["Face"], response_class=FileResponse)
+async def find_face_image(request: FaceFindRequest):
+    try:
+        result = await face_service.find_face(
+            user_id=request.user_id,
+            query=request.query,
+            min_score=0.7
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка при поиске лица: {str(e)}")
+    if not result:
+        raise HTTPException(status_code=404, detail="Лицо не найдено")
+    return FileResponse(
+        face_service.image_path(result),
+        media_type=result["media_type"],
+        headers={"X-Face-Id": result["id"], "X-Face-Score": f"{result['score']:.4f}"}
+    )
+
 if __name__ == "__main__":
     uvicorn.run(
         "app.main:app",
         host=os.getenv("HOST", "0.0.0.0"),
         port=8006,
+        workers=int(os.getenv("WORKERS", 1)),
         reload=os.getenv("DEBUG", "false").lower() == "true"
     ) 
\ No newline at end of file
@@ -0,0 +1,269 @@
+import argparse
+import asyncio
+import logging
+import sys
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+from qdrant_client.http.models import PointStruct
+
+from .services.consolidation_service import ConsolidationService
+from .services.projection import Projection
+from .services.qdrant_service import QdrantService
+
+logger = logging.getLogger(__name__)
+
+
+async def dedup_memories(
+    qdrant_service: QdrantService,
+    user_id: Optional[str] = None,
+    dry_run: bool = False,
+    batch_size: int = 256
+) -> Dict[str, int]:
+    groups: Dict[str, List[Tuple[str, str]]] = {}
+    scanned = 0
+    async for records in qdrant_service.iter_points(user_id=user_id, batch_size=batch_size):
+        for record in records:
+            payload = record.payload or {}
+            content_id = QdrantService.content_point_id(
+                payload.get("user_id", ""),
+                payload.get("content", ""),
+                payload.get("context")
+            )
+            groups.setdefault(content_id, []).append((str(record.id), payload.get("time") or ""))
+            scanned += 1
+
+    stats = {"scanned": scanned, "groups": len(groups), "rekeyed": 0, "removed": 0}
+    to_delete: List[str] = []
+
+    for content_id, points in groups.items():
+        point_ids = {point_id for point_id, _ in points}
+        if point_ids == {content_id}:
+            continue
+
+        latest_id, latest_time = max(points, key=lambda point: point[1])
+        duplicates = [point_id for point_id in point_ids if point_id != content_id]
+        stats["removed"] += len(duplicates)
+        if content_id not in point_ids:
+            stats["rekeyed"] += 1
+        if dry_run:
+            continue
+
+        if content_id in point_ids:
+            await qdrant_service.touch_points([content_id], time=latest_time)
+        else:
+            record = (await qdrant_service.retrieve_points([latest_id], with_vectors=True))[0]
+            await qdrant_service.upsert_points([
+                PointStruct(id=content_id, vector=record.vector, payload=record.payload)
+            ])
+
+        to_delete.extend(duplicates)
+        if len(to_delete) >= batch_size:
+            await qdrant_service.delete_points(to_delete)
+            to_delete = []
+
+    if to_delete and not dry_run:
+        await qdrant_service.delete_points(to_delete)
+
+    return stats
+
+
+async def open_source(collection_name: Optional[str], target: QdrantService) -> QdrantService:
+    if not collection_name or collection_name == target.collection_name:
+        return target
+    source = QdrantService()
+    source.collection_name = collection_name
+    await source.connect()
+    await source.load_layout()
+    return source
+
+
+async def fit_projection(
+    qdrant_service: QdrantService,
+    dim: int,
+    sample: int,
+    source_collection: Optional[str] = None,
+    dry_run: bool = False
+) -> Projection:
+    source = await open_source(source_collection, qdrant_service)
+    vectors = []
+    try:
+        async for records in source.iter_points(with_vectors=True, batch_size=512, with_payload=False):
+            vectors.extend(record.vector for record in records)
+            if len(vectors) >= sample:
+                break
+    finally:
+        if source is not qdrant_service:
+            await source.close()
+
+    projection = await asyncio.to_thread(Projection.fit, np.asarray(vectors[:sample], dtype=np.float32), dim)
+    projection.fitted_at = QdrantService.current_time()
+    logger.info(
+        f"PCA {projection.source_dim}->{projection.dim} по {projection.sample_size} векторам: "
+        f"объясненная дисперсия {projection.explained_variance:.3f}"
+    )
+    if not dry_run:
+        await qdrant_service.save_projection(projection)
+    return projection
+
+
+async def copy_collection(qdrant_service: QdrantService, source_collection: str, batch_size: int = 256) -> int:
+    source = await open_source(source_collection, qdrant_service)
+    if source is qdrant_service:
+        raise ValueError("Источник совпадает с QDRANT_COLLECTION")
+    try:
+        await qdrant_service.initialize(await source.get_vector_size())
+        copied = 0
+        async for records in source.iter_points(with_vectors=True, batch_size=batch_size):
+            await qdrant_service.upsert_points([
+                PointStruct(id=record.id, vector=record.vector, payload=record.payload)
+                for record in records
+            ])
+            copied += len(records)
+            logger.info(f"Перенесено {copied} точек")
+        return copied
+    finally:
+        await source.close()
+
+
+async def run(args: argparse.Namespace) -> int:
+    qdrant_service = QdrantService()
+    await qdrant_service.connect()
+    try:
+        if await qdrant_service.client.collection_exists(qdrant_service.collection_name):
+            await qdrant_service.load_layout()
+        if args.command == "dedup":
+            stats = await dedup_memories(
+                qdrant_service,
+                user_id=args.user_id,
+                dry_run=args.dry_run,
+                batch_size=args.batch_size
+            )
+            prefix = "[dry-run] " if args.dry_run else ""
+            logger.info(
+                f"{prefix}Дедупликация завершена: просмотрено {stats['scanned']}, "
+                f"уникальных {stats['groups']}, перенесено {stats['rekeyed']}, удалено {stats['removed']}"
+            )
+        elif args.command == "consolidate":
+            consolidation = ConsolidationService(qdrant_service)
+            consolidation.batch_size = args.batch_size
+            consolidation.pause = args.pause_ms / 1000
+            if args.similarity is not None:
+                consolidation.similarity = args.similarity
+            if args.max_memories is not None:
+                consolidation.max_memories = args.max_memories
+            if args.max_age_days is not None:
+                consolidation.max_age_days = args.max_age_days
+            stats = await consolidation.run_pass(user_id=args.user_id, dry_run=args.dry_run, max_users=args.max_users)
+            prefix = "[dry-run] " if args.dry_run else ""
+            logger.info(
+                f"{prefix}Консолидация: пользователей {stats['users']}, просмотрено {stats['scanned']}, "
+                f"удалено {stats['removed']} (слито {stats['merged']}, устарело {stats['expired']}, "
+                f"сверх лимита {stats['trimmed']}), освобождено ~{stats['bytes_reclaimed']} байт"
+            )
+            if stats["failed"]:
+                logger.error(f"Консолидация не выполнена для {stats['failed']} пользователей")
+                return 1
+        elif args.command == "backfill-timestamps":
+            stats = await qdrant_service.backfill_timestamps(batch_size=args.batch_size, dry_run=args.dry_run)
+            prefix = "[dry-run] " if args.dry_run else ""
+            logger.info(
+                f"{prefix}Заполнение timestamp завершено: просмотрено {stats['scanned']}, "
+                f"обновлено {stats['updated']}, без разбираемого времени {stats['unparsed']}"
+            )
+        elif args.command == "fit-projection":
+            dim = args.dim or qdrant_service.compact_size or qdrant_service.compact_dim
+            if not dim:
+                raise ValueError("Размерность проекции не задана: --dim или QDRANT_COMPACT_DIM")
+            await fit_projection(qdrant_service, dim, args.sample, args.source_collection, args.dry_run)
+            if not args.dry_run and qdrant_service.compact_active:
+                logger.info("Проекция сохранена. Пересчитайте векторы: python -m app.maintenance apply-projection")
+        elif args.command == "apply-projection":
+            stats = await qdrant_service.apply_projection(batch_size=args.batch_size)
+            logger.info(
+                f"Компактные векторы обновлены у {stats['updated']} точек, дозаполнено {stats['filled']}. "
+                f"Запущенные сервисы переключатся на компактный поиск в течение QDRANT_PROJECTION_REFRESH"
+            )
+        elif args.command == "copy-collection":
+            copied = await copy_collection(qdrant_service, args.source, batch_size=args.batch_size)
+            logger.info(f"Коллекция {args.source} перенесена в {qdrant_service.collection_name}: {copied} точек")
+        elif args.command == "migrate-storage":
+            result = await qdrant_service.migrate_storage(snapshot=not args.no_snapshot, dry_run=args.dry_run)
+            if not result["changed"]:
+                logger.info(f"Конфигурация хранения уже соответствует настройкам: {result['target']}")
+            elif args.dry_run:
+                logger.info(f"[dry-run] Будет выполнена миграция: {result['current']} -> {result['target']}")
+            else:
+                logger.info(
+                    f"Миграция запущена: {result['current']} -> {result['target']}. "
+                    f"Квантованные данные строятся в фоне, поиск продолжает работать"
+                )
+        return 0
+    finally:
+        await qdrant_service.close()
+
+
+def main():
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Обслуживание коллекции воспоминаний")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    dedup_parser = subparsers.add_parser("dedup", help="Схлопнуть дубликаты (user_id, content, context)")
+    dedup_parser.add_argument("--user-id", default=None)
+    dedup_parser.add_argument("--dry-run", action="store_true")
+    dedup_parser.add_argument("--batch-size", type=int, default=256)
+
+    consolidate_parser = subparsers.add_parser(
+        "consolidate",
+        help="Слить почти одинаковые воспоминания и удалить устаревшие по правилам CONSOLIDATION_*"
+    )
+    consolidate_parser.add_argument("--user-id", default=None)
+    consolidate_parser.add_argument("--dry-run", action="store_true")
+    consolidate_parser.add_argument("--batch-size", type=int, default=256)
+    consolidate_parser.add_argument("--pause-ms", type=float, default=0.0)
+    consolidate_parser.add_argument("--max-users", type=int, default=0, help="0 - все пользователи")
+    consolidate_parser.add_argument("--similarity", type=float, default=None)
+    consolidate_parser.add_argument("--max-memories", type=int, default=None)
+    consolidate_parser.add_argument("--max-age-days", type=float, default=None)
+
+    backfill_parser = subparsers.add_parser(
+        "backfill-timestamps",
+        help="Заполнить числовое поле timestamp у точек, сохраненных до его появления"
+    )
+    backfill_parser.add_argument("--dry-run", action="store_true")
+    backfill_parser.add_argument("--batch-size", type=int, default=256)
+
+    fit_parser = subparsers.add_parser(
+        "fit-projection",
+        help="Обучить PCA-проекцию для компактных векторов (QDRANT_COMPACT_DIM) на выборке из коллекции"
+    )
+    fit_parser.add_argument("--dim", type=int, default=None)
+    fit_parser.add_argument("--sample", type=int, default=20000)
+    fit_parser.add_argument("--source-collection", default=None, help="по умолчанию QDRANT_COLLECTION")
+    fit_parser.add_argument("--dry-run", action="store_true")
+
+    apply_parser = subparsers.add_parser("apply-projection", help="Пересчитать компактные векторы всех точек")
+    apply_parser.add_argument("--batch-size", type=int, default=256)
+
+    copy_parser = subparsers.add_parser(
+        "copy-collection",
+        help="Перенести точки из другой коллекции в QDRANT_COLLECTION с текущей схемой векторов"
+    )
+    copy_parser.add_argument("--source", required=True)
+    copy_parser.add_argument("--batch-size", type=int, default=256)
+
+    storage_parser = subparsers.add_parser(
+        "migrate-storage",
+        help="Привести квантование и on_disk существующей коллекции к настройкам QDRANT_*"
+    )
+    storage_parser.add_argument("--dry-run", action="store_true")
+    storage_parser.add_argument("--no-snapshot", action="store_true")
+
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
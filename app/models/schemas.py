@@ -1,16 +1,41 @@
+from datetime import datetime
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 
 class MemoryCreate(BaseModel):
     user_id: str = Field(..., min_length=1)
     content: str = Field(..., min_length=1)
     context: Optional[str] = Field(None)
 
+class MemoryBatchCreate(BaseModel):
+    items: List[MemoryCreate] = Field(..., min_length=1, max_length=5000)
+    wait: bool = Field(True)
+    chunk_size: Optional[int] = Field(None, ge=1, le=1000)
+
+class MemoryBatchItemResult(BaseModel):
+    index: int
+    status: str
+    memory_id: Optional[str] = None
+    error: Optional[str] = None
+
+class MemoryBatchResponse(BaseModel):
+    status: str
+    stored: int
+    failed: int
+    items: List[MemoryBatchItemResult]
+
 class MemorySearch(BaseModel):
     user_id: str = Field(..., min_length=1)
     query: str = Field(..., min_length=1)
     limit: int = Field(5, ge=1, le=50)
     min_score: float = Field(0.3, ge=0.0, le=1.0)
+    time_from: Optional[datetime] = Field(None)
+    time_to: Optional[datetime] = Field(None)
+    recency_half_life_days: Optional[float] = Field(None, gt=0)
+    recency_weight: float = Field(0.5, ge=0.0, le=1.0)
+
+class MemoryBatchSearch(BaseModel):
+    queries: List[MemorySearch] = Field(..., min_length=1, max_length=64)
 
 class MemoryResponse(BaseModel):
     user_id: str
@@ -18,6 +43,31 @@ class MemoryResponse(BaseModel):
     score: float
     time: str
     context: Optional[str] = None
+
+class MemoryRecord(BaseModel):
+    id: str
+    user_id: str
+    content: str
+    context: Optional[str] = None
+    time: Optional[str] = None
+    vector: Optional[List[float]] = None
+
+class MemoryListResponse(BaseModel):
+    items: List[MemoryRecord]
+    next_cursor: Optional[str] = None
+
+class MemoryImportResponse(BaseModel):
+    status: str
+    imported: int
+    encoded: int
+    failed: int
+    errors: List[str]
+
+class MemorySearchGroup(BaseModel):
+    index: int
+    user_id: str
+    query: str
+    memories: List[MemoryResponse]
 class MemoryStats(BaseModel):
     user_id: str
     total_memories: int
@@ -0,0 +1,70 @@
+import hashlib
+import os
+import tempfile
+from typing import BinaryIO, Tuple
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class BlobStore:
+
+    def __init__(self, root: str = None):
+        self.root = root or os.getenv("FACE_BLOB_DIR", "data/blobs")
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, blob_id: str) -> str:
+        if len(blob_id) != 64 or any(c not in "0123456789abcdef" for c in blob_id):
+            raise ValueError(f"Некорректный идентификатор блоба: {blob_id}")
+        return os.path.join(self.root, blob_id[:2], blob_id[2:4], blob_id)
+
+    def exists(self, blob_id: str) -> bool:
+        return os.path.exists(self.path(blob_id))
+
+    def put(self, data: bytes) -> str:
+        blob_id = hashlib.sha256(data).hexdigest()
+        path = self.path(blob_id)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".upload-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+        return blob_id
+
+    def put_stream(self, source: BinaryIO) -> Tuple[str, int]:
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                while True:
+                    chunk = source.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+            blob_id = digest.hexdigest()
+            path = self.path(blob_id)
+            if os.path.exists(path):
+                os.unlink(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+            return blob_id, size
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def read(self, blob_id: str) -> bytes:
+        with open(self.path(blob_id), "rb") as f:
+            return f.read()
+
+    def size(self, blob_id: str) -> int:
+        return os.path.getsize(self.path(blob_id))
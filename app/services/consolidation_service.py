@@ -0,0 +1,305 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+import numpy as np
+
+from . import metrics
+from .qdrant_service import QdrantService
+
+logger = logging.getLogger(__name__)
+
+
+def cluster_near_duplicates(vectors: np.ndarray, threshold: float) -> List[List[int]]:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms > 0, norms, 1.0)
+    assigned = np.zeros(len(vectors), dtype=bool)
+    clusters = []
+    for i in range(len(vectors)):
+        if assigned[i]:
+            continue
+        assigned[i] = True
+        rest = np.flatnonzero(~assigned[i + 1:]) + i + 1
+        members = rest[vectors[rest] @ vectors[i] >= threshold] if len(rest) else rest
+        assigned[members] = True
+        if len(members):
+            clusters.append([i, *members.tolist()])
+    return clusters
+
+
+class ConsolidationService:
+
+    def __init__(self, qdrant_service: QdrantService, hot_users=None, search_cache=None):
+        self.qdrant_service = qdrant_service
+        self.hot_users = hot_users
+        self.search_cache = search_cache
+        self.enabled = os.getenv("CONSOLIDATION_ENABLED", "false").lower() == "true"
+        self.interval = float(os.getenv("CONSOLIDATION_INTERVAL", 3600))
+        self.similarity = float(os.getenv("CONSOLIDATION_SIMILARITY", 0.95))
+        self.max_memories = int(os.getenv("CONSOLIDATION_MAX_MEMORIES_PER_USER", 0))
+        self.max_age_days = float(os.getenv("CONSOLIDATION_MAX_AGE_DAYS", 0))
+        self.batch_size = int(os.getenv("CONSOLIDATION_BATCH_SIZE", 256))
+        self.max_cluster_points = int(os.getenv("CONSOLIDATION_MAX_CLUSTER_POINTS", 5000))
+        self.pause = float(os.getenv("CONSOLIDATION_PAUSE_MS", 50)) / 1000
+        self.max_inflight = int(os.getenv("CONSOLIDATION_MAX_INFLIGHT", 4))
+        self.users_per_run = int(os.getenv("CONSOLIDATION_USERS_PER_RUN", 1000))
+        self.workers = int(os.getenv("WORKERS") or os.getenv("WEB_CONCURRENCY") or 1)
+        self.vector_size: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._cursor: Optional[Union[str, int]] = None
+        self.running = False
+        self.runs = 0
+        self.last_run: Optional[Dict[str, Any]] = None
+        self.totals = self._empty_stats()
+
+    @staticmethod
+    def _empty_stats() -> Dict[str, Any]:
+        return {
+            "users": 0,
+            "scanned": 0,
+            "merged": 0,
+            "expired": 0,
+            "trimmed": 0,
+            "removed": 0,
+            "bytes_reclaimed": 0,
+            "failed": 0
+        }
+
+    @staticmethod
+    def _point_timestamp(payload: Dict[str, Any]) -> Optional[int]:
+        timestamp = payload.get("timestamp")
+        if isinstance(timestamp, int):
+            return timestamp
+        return QdrantService.to_timestamp(payload.get("time"))
+
+    @staticmethod
+    def _json_bytes(value: Any) -> int:
+        return len(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+    def _point_bytes(self, payload: Dict[str, Any]) -> int:
+        return (self.vector_size or 0) * 4 + self._json_bytes(payload)
+
+    @staticmethod
+    def _merged_from(keeper: Dict[str, Any], members: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        items = list(keeper.get("merged_from") or [])
+        seen = {(keeper.get("content"), keeper.get("context"))}
+        seen.update((item.get("content"), item.get("context")) for item in items)
+        for member in members:
+            for item in [member, *(member.get("merged_from") or [])]:
+                key = (item.get("content"), item.get("context"))
+                if key in seen:
+                    continue
+                seen.add(key)
+                items.append({"content": item.get("content"), "context": item.get("context"), "time": item.get("time")})
+        return items
+
+    async def _yield_to_traffic(self):
+        await asyncio.sleep(self.pause)
+        while metrics.REGISTRY.enabled and self.max_inflight > 0 and metrics.INFLIGHT_REQUESTS.value() > self.max_inflight:
+            await asyncio.sleep(max(self.pause, 0.05))
+
+    async def _load_vectors(self, point_ids: List[str]) -> Dict[str, np.ndarray]:
+        vectors = {}
+        for start in range(0, len(point_ids), self.batch_size):
+            records = await self.qdrant_service.retrieve_points(point_ids[start:start + self.batch_size], with_vectors=True)
+            for record in records:
+                vectors[str(record.id)] = np.asarray(record.vector, dtype=np.float32)
+            await self._yield_to_traffic()
+        return vectors
+
+    async def _delete(self, point_ids: List[str]):
+        for start in range(0, len(point_ids), self.batch_size):
+            await self.qdrant_service.delete_points(point_ids[start:start + self.batch_size])
+            await self._yield_to_traffic()
+
+    async def consolidate_user(self, user_id: str, dry_run: bool = False) -> Dict[str, Any]:
+        stats = self._empty_stats()
+        stats["users"] = 1
+        if self.vector_size is None:
+            self.vector_size = await self.qdrant_service.get_vector_size()
+
+        points: List[Tuple[str, Dict[str, Any]]] = []
+        async for records in self.qdrant_service.iter_points(user_id=user_id, batch_size=self.batch_size):
+            points.extend((str(record.id), record.payload or {}) for record in records)
+            await self._yield_to_traffic()
+        stats["scanned"] = len(points)
+        payloads = dict(points)
+        points.sort(key=lambda point: point[1].get("time") or "", reverse=True)
+
+        removed: Dict[str, str] = {}
+        if self.max_age_days > 0:
+            cutoff = time.time() - self.max_age_days * 86400
+            for point_id, payload in points:
+                point_time = self._point_timestamp(payload)
+                if point_time is not None and point_time < cutoff:
+                    removed[point_id] = "expired"
+            points = [point for point in points if point[0] not in removed]
+
+        merges: Dict[str, Dict[str, Any]] = {}
+        if self.similarity < 1.0 and 1 < len(points) <= self.max_cluster_points:
+            vectors = await self._load_vectors([point_id for point_id, _ in points])
+            candidates = [point for point in points if point[0] in vectors]
+            if len(candidates) > 1:
+                matrix = np.stack([vectors[point_id] for point_id, _ in candidates])
+                clusters = await asyncio.to_thread(cluster_near_duplicates, matrix, self.similarity)
+                for cluster in clusters:
+                    keeper_id, keeper = candidates[cluster[0]]
+                    merges[keeper_id] = {
+                        "merged": sum(int(candidates[i][1].get("merged", 1)) for i in cluster),
+                        "merged_from": self._merged_from(keeper, [candidates[i][1] for i in cluster[1:]])
+                    }
+                    for i in cluster[1:]:
+                        removed[candidates[i][0]] = "merged"
+                points = [point for point in points if point[0] not in removed]
+        elif len(points) > self.max_cluster_points:
+            logger.info(f"Пользователь {user_id}: {len(points)} воспоминаний, кластеризация пропущена (лимит {self.max_cluster_points})")
+
+        if self.max_memories > 0 and len(points) > self.max_memories:
+            for point_id, _ in points[self.max_memories:]:
+                removed[point_id] = "trimmed"
+                merges.pop(point_id, None)
+
+        for reason in ("expired", "merged", "trimmed"):
+            stats[reason] = sum(1 for value in removed.values() if value == reason)
+        stats["removed"] = len(removed)
+        stats["bytes_reclaimed"] = sum(self._point_bytes(payloads[point_id]) for point_id in removed) - sum(
+            self._json_bytes(merge["merged_from"]) - self._json_bytes(payloads[keeper_id].get("merged_from") or [])
+            for keeper_id, merge in merges.items()
+        )
+        if dry_run or not removed:
+            return stats
+
+        for keeper_id, merge in merges.items():
+            await self.qdrant_service.set_payload([keeper_id], merge)
+        await self._delete(list(removed))
+        if self.hot_users is not None:
+            self.hot_users.invalidate(user_id)
+        if self.search_cache is not None:
+            self.search_cache.bump(user_id)
+
+        if metrics.REGISTRY.enabled:
+            for reason in ("expired", "merged", "trimmed"):
+                if stats[reason]:
+                    metrics.CONSOLIDATION_REMOVED.inc(reason, amount=stats[reason])
+            metrics.CONSOLIDATION_RECLAIMED_BYTES.inc(amount=stats["bytes_reclaimed"])
+        logger.info(
+            f"Консолидация пользователя {user_id}: удалено {stats['removed']} из {stats['scanned']} "
+            f"(слито {stats['merged']}, устарело {stats['expired']}, сверх лимита {stats['trimmed']}), "
+            f"освобождено ~{stats['bytes_reclaimed']} байт"
+        )
+        return stats
+
+    async def _consolidate_into(self, stats: Dict[str, Any], user_id: str, dry_run: bool):
+        try:
+            user_stats = await self.consolidate_user(user_id, dry_run=dry_run)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Ошибка при консолидации пользователя {user_id}: {e}")
+            stats["failed"] += 1
+            return
+        for name, value in user_stats.items():
+            stats[name] += value
+
+    async def run_pass(
+        self,
+        user_id: Optional[str] = None,
+        dry_run: bool = False,
+        max_users: Optional[int] = None
+    ) -> Dict[str, Any]:
+        stats = self._empty_stats()
+        started = time.perf_counter()
+        max_users = self.users_per_run if max_users is None else max_users
+        self.running = True
+        try:
+            if user_id is not None:
+                await self._consolidate_into(stats, user_id, dry_run)
+            else:
+                seen: Set[str] = set()
+                offset = self._cursor
+                while True:
+                    records, next_offset = await self.qdrant_service.scroll_page(
+                        limit=self.batch_size,
+                        offset=offset,
+                        with_payload=["user_id"]
+                    )
+                    offset = next_offset
+                    for record in records:
+                        record_user_id = (record.payload or {}).get("user_id")
+                        if not record_user_id or record_user_id in seen:
+                            continue
+                        if max_users > 0 and len(seen) >= max_users:
+                            offset = record.id
+                            break
+                        seen.add(record_user_id)
+                        await self._consolidate_into(stats, record_user_id, dry_run)
+                    await self._yield_to_traffic()
+                    if offset is None or offset != next_offset:
+                        break
+                if not dry_run:
+                    self._cursor = offset
+        finally:
+            self.running = False
+
+        stats["seconds"] = round(time.perf_counter() - started, 3)
+        if not dry_run:
+            self.runs += 1
+            self.last_run = {**stats, "finished_at": QdrantService.current_time()}
+            for name in self.totals:
+                self.totals[name] += stats[name]
+        logger.info(
+            f"{'[dry-run] ' if dry_run else ''}Консолидация завершена за {stats['seconds']:.1f} с: "
+            f"пользователей {stats['users']}, просмотрено {stats['scanned']}, удалено {stats['removed']}, "
+            f"освобождено ~{stats['bytes_reclaimed']} байт, ошибок {stats['failed']}"
+        )
+        return stats
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_pass()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка фоновой консолидации: {e}")
+
+    def start(self):
+        if not self.enabled or self._task is not None:
+            return
+        if self.workers > 1:
+            logger.warning(
+                f"Фоновая консолидация отключена: {self.workers} воркеров обрабатывали бы одних и тех же пользователей "
+                f"одновременно. Запускайте ее по расписанию: python -m app.maintenance consolidate"
+            )
+            return
+        if self.max_memories <= 0 and self.max_age_days <= 0 and self.similarity >= 1.0:
+            logger.warning("Консолидация включена, но ни одно правило не задано")
+            return
+        logger.info(
+            f"Фоновая консолидация: раз в {self.interval:.0f} с, порог сходства {self.similarity}, "
+            f"лимит {self.max_memories or '-'} воспоминаний, возраст {self.max_age_days or '-'} дн."
+        )
+        self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "running": self.running,
+            "runs": self.runs,
+            "resume_from": str(self._cursor) if self._cursor is not None else None,
+            "last_run": self.last_run,
+            "totals": dict(self.totals)
+        }
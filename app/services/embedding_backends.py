@@ -0,0 +1,293 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+from typing import Dict, List, Union
+
+import numpy as np
+
+from .metrics import timed
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("torch", "onnx", "onnx-int8", "fake")
+
+
+def mean_pool(token_embeddings: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    mask = attention_mask[..., None].astype(np.float32)
+    summed = (token_embeddings * mask).sum(axis=1)
+    counts = np.clip(mask.sum(axis=1), 1e-9, None)
+    return summed / counts
+
+
+def l2_normalize(embeddings: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.clip(norms, 1e-12, None)
+
+
+class EmbeddingBackend:
+    name = "base"
+
+    def __init__(self, model_name: str, device: str = "cpu"):
+        self.model_name = model_name
+        self.device = device
+        self.batch_size = int(os.getenv("EMBEDDING_INFERENCE_BATCH_SIZE", 32))
+        self.tokenizer = None
+        self.max_seq_length = 512
+
+    def artifact_dir(self, env_name: str, default: str) -> str:
+        base_dir = os.getenv(env_name, os.path.expanduser(default))
+        return os.path.join(base_dir, re.sub(r"[^\w.-]+", "__", self.model_name))
+
+    @property
+    def local_model_dir(self) -> str:
+        return self.artifact_dir("EMBEDDING_MODEL_CACHE_DIR", "~/.cache/ltm/models")
+
+    def has_local_model(self) -> bool:
+        return os.path.exists(os.path.join(self.local_model_dir, "modules.json"))
+
+    def load(self):
+        raise NotImplementedError
+
+    def load_tokenizer(self):
+        from transformers import AutoTokenizer
+        source = self.local_model_dir if self.has_local_model() else self.model_name
+        self.tokenizer = AutoTokenizer.from_pretrained(source)
+        self.max_seq_length = min(
+            int(os.getenv("EMBEDDING_MAX_SEQ_LENGTH", 512)),
+            self.tokenizer.model_max_length
+        )
+        return self
+
+    @timed("embedding.tokenize", batch_arg=1)
+    def tokenize(self, texts: List[str]) -> Dict[str, np.ndarray]:
+        return dict(self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_seq_length,
+            return_tensors="np"
+        ))
+
+    def encode_tokens(self, features: Dict[str, np.ndarray]) -> np.ndarray:
+        raise NotImplementedError
+
+    def encode(self, text: Union[str, List[str]], **kwargs) -> np.ndarray:
+        single = isinstance(text, str)
+        texts = [text] if single else list(text)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        order = sorted(range(len(texts)), key=lambda i: -len(texts[i]))
+        chunks = []
+        for start in range(0, len(order), self.batch_size):
+            chunk = [texts[i] for i in order[start:start + self.batch_size]]
+            chunks.append(self.encode_tokens(self.tokenize(chunk)))
+        sorted_embeddings = np.concatenate(chunks, axis=0)
+
+        embeddings = np.empty_like(sorted_embeddings)
+        embeddings[order] = sorted_embeddings
+        return embeddings[0] if single else embeddings
+
+
+class TorchBackend(EmbeddingBackend):
+    name = "torch"
+
+    def load(self):
+        from sentence_transformers import SentenceTransformer
+
+        if self.has_local_model():
+            logger.info(f"Загружаю модель из локальной копии: {self.local_model_dir}")
+            self.model = SentenceTransformer(self.local_model_dir, device=self.device)
+        else:
+            self.model = SentenceTransformer(self.model_name, device=self.device)
+            if os.getenv("EMBEDDING_MODEL_CACHE", "true").lower() == "true" and not os.path.isdir(self.model_name):
+                self.save_local()
+        self.tokenizer = self.model.tokenizer
+        self.max_seq_length = self.model.max_seq_length
+        return self
+
+    def save_local(self):
+        parent = os.path.dirname(self.local_model_dir)
+        os.makedirs(parent, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=parent, prefix=".save-")
+        try:
+            self.model.save(tmp_dir)
+            os.replace(tmp_dir, self.local_model_dir)
+            logger.info(f"Локальная копия модели сохранена: {self.local_model_dir}")
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить локальную копию модели: {e}")
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    @timed("embedding.forward")
+    def encode_tokens(self, features: Dict[str, np.ndarray]) -> np.ndarray:
+        import torch
+        inputs = {key: torch.from_numpy(value).to(self.device) for key, value in features.items()}
+        with torch.inference_mode():
+            output = self.model(inputs)["sentence_embedding"]
+        return output.float().cpu().numpy()
+
+
+class OnnxBackend(EmbeddingBackend):
+    name = "onnx"
+
+    def __init__(self, model_name: str, device: str = "cpu", quantized: bool = False):
+        super().__init__(model_name, device)
+        self.quantized = quantized
+        if quantized:
+            self.name = "onnx-int8"
+        self.export_dir = self.artifact_dir("EMBEDDING_ONNX_DIR", "~/.cache/ltm/onnx")
+        self.session = None
+        self.pooling = "mean"
+        self.normalize = True
+
+    @property
+    def model_path(self) -> str:
+        return os.path.join(self.export_dir, "model.int8.onnx" if self.quantized else "model.onnx")
+
+    def load_tokenizer(self):
+        from transformers import AutoTokenizer
+
+        if not os.path.exists(os.path.join(self.export_dir, "model.onnx")):
+            self.export()
+        if self.quantized and not os.path.exists(self.model_path):
+            self.quantize()
+
+        with open(os.path.join(self.export_dir, "ltm_config.json"), encoding="utf-8") as f:
+            config = json.load(f)
+        self.max_seq_length = config["max_seq_length"]
+        self.pooling = config["pooling"]
+        self.normalize = config["normalize"]
+        self.tokenizer = AutoTokenizer.from_pretrained(self.export_dir)
+        return self
+
+    def load(self):
+        import onnxruntime as ort
+
+        self.load_tokenizer()
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = int(os.getenv("EMBEDDING_NUM_THREADS", 0))
+        self.session = ort.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {node.name for node in self.session.get_inputs()}
+        logger.info(f"ONNX-модель загружена: {self.model_path}")
+        return self
+
+    def export(self):
+        import torch
+        from sentence_transformers import SentenceTransformer
+        from sentence_transformers.models import Normalize, Pooling
+
+        logger.info(f"Экспортирую {self.model_name} в ONNX: {self.export_dir}")
+        os.makedirs(self.export_dir, exist_ok=True)
+        source = self.local_model_dir if self.has_local_model() else self.model_name
+        model = SentenceTransformer(source, device="cpu")
+        transformer = model[0].auto_model.eval()
+        pooling = next((module for module in model if isinstance(module, Pooling)), None)
+
+        features = model.tokenizer(["passage: export"], return_tensors="pt")
+        input_names = list(features.keys())
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+        with torch.inference_mode():
+            torch.onnx.export(
+                transformer,
+                tuple(features[name] for name in input_names),
+                os.path.join(self.export_dir, "model.onnx"),
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=14
+            )
+
+        model.tokenizer.save_pretrained(self.export_dir)
+        with open(os.path.join(self.export_dir, "ltm_config.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "model_name": self.model_name,
+                "max_seq_length": model.max_seq_length,
+                "pooling": "cls" if pooling is not None and pooling.pooling_mode_cls_token else "mean",
+                "normalize": any(isinstance(module, Normalize) for module in model)
+            }, f)
+
+    def quantize(self):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        logger.info(f"Квантую ONNX-модель в int8: {self.model_path}")
+        quantize_dynamic(
+            os.path.join(self.export_dir, "model.onnx"),
+            self.model_path,
+            weight_type=QuantType.QInt8,
+            use_external_data_format=True
+        )
+
+    @timed("embedding.forward")
+    def encode_tokens(self, features: Dict[str, np.ndarray]) -> np.ndarray:
+        inputs = {key: value.astype(np.int64) for key, value in features.items() if key in self.input_names}
+        token_embeddings = self.session.run(None, inputs)[0]
+        if self.pooling == "cls":
+            embeddings = token_embeddings[:, 0]
+        else:
+            embeddings = mean_pool(token_embeddings, features["attention_mask"])
+        if self.normalize:
+            embeddings = l2_normalize(embeddings)
+        return embeddings.astype(np.float32)
+
+
+class FakeBackend(EmbeddingBackend):
+    name = "fake"
+    PREFIXES = ("query: ", "passage: ")
+
+    def __init__(self, model_name: str, device: str = "cpu"):
+        super().__init__(model_name, device)
+        self.dimension = int(os.getenv("EMBEDDING_FAKE_DIM", 1024))
+        self.latency = float(os.getenv("EMBEDDING_FAKE_LATENCY_MS", 0)) / 1000.0
+        self._token_vectors: Dict[str, np.ndarray] = {}
+
+    def load_tokenizer(self):
+        return self
+
+    def load(self):
+        logger.info(f"Детерминированный фейковый эмбеддер: размерность {self.dimension}, задержка {self.latency * 1000:.1f} мс")
+        return self
+
+    def _token_vector(self, token: str) -> np.ndarray:
+        vector = self._token_vectors.get(token)
+        if vector is None:
+            seed = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+            vector = np.random.default_rng(seed).standard_normal(self.dimension).astype(np.float32)
+            if len(self._token_vectors) < 100000:
+                self._token_vectors[token] = vector
+        return vector
+
+    def tokenize(self, texts: List[str]) -> Dict[str, np.ndarray]:
+        return {"texts": np.array(texts, dtype=object)}
+
+    def encode_tokens(self, features: Dict[str, np.ndarray]) -> np.ndarray:
+        if self.latency:
+            time.sleep(self.latency)
+        embeddings = np.zeros((len(features["texts"]), self.dimension), dtype=np.float32)
+        for row, text in enumerate(features["texts"]):
+            for prefix in self.PREFIXES:
+                if text.startswith(prefix):
+                    text = text[len(prefix):]
+                    break
+            for token in text.lower().split() or [""]:
+                embeddings[row] += self._token_vector(token)
+        return l2_normalize(embeddings)
+
+
+def create_backend(name: str, model_name: str, device: str = "cpu") -> EmbeddingBackend:
+    if name == "torch":
+        return TorchBackend(model_name, device)
+    if name == "onnx":
+        return OnnxBackend(model_name, device)
+    if name == "onnx-int8":
+        return OnnxBackend(model_name, device, quantized=True)
+    if name == "fake":
+        return FakeBackend(model_name, device)
+    raise ValueError(f"Неизвестный бэкенд эмбеддингов: {name}. Доступны: {', '.join(BACKENDS)}")
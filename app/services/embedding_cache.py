@@ -0,0 +1,125 @@
+import hashlib
+import logging
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class RedisEmbeddingCacheBackend:
+
+    def __init__(self, url: str, ttl: Optional[float] = None, prefix: str = "ltm:emb:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("Для общего кэша эмбеддингов необходимо установить пакет redis") from e
+        self.client = redis.from_url(url)
+        self.ttl = int(ttl) if ttl else None
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[np.ndarray]:
+        raw = await self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        return np.frombuffer(raw, dtype=np.float32)
+
+    async def set(self, key: str, vector: np.ndarray):
+        await self.client.set(self.prefix + key, vector.tobytes(), ex=self.ttl)
+
+    async def close(self):
+        await self.client.close()
+
+
+class EmbeddingCache:
+
+    def __init__(
+        self,
+        max_size: int = 10000,
+        ttl: Optional[float] = None,
+        backend: Optional[RedisEmbeddingCacheBackend] = None
+    ):
+        self.max_size = max_size
+        self.ttl = ttl or None
+        self.backend = backend
+        self._entries: "OrderedDict[str, Tuple[float, np.ndarray]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.backend_hits = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def make_key(model_name: str, text: str) -> str:
+        normalized = " ".join(unicodedata.normalize("NFC", text).split())
+        return hashlib.sha1(f"{model_name}\x00{normalized}".encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[np.ndarray]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, vector = entry
+            if expires_at and expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vector
+
+        if self.backend is not None:
+            try:
+                vector = await self.backend.get(key)
+            except Exception as e:
+                logger.error(f"Ошибка чтения из общего кэша эмбеддингов: {e}")
+                vector = None
+            if vector is not None:
+                self.backend_hits += 1
+                self._put(key, vector)
+                return self._entries[key][1]
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, vector: np.ndarray):
+        vector = self._put(key, vector)
+        if self.backend is not None:
+            try:
+                await self.backend.set(key, vector)
+            except Exception as e:
+                logger.error(f"Ошибка записи в общий кэш эмбеддингов: {e}")
+
+    def _put(self, key: str, vector: np.ndarray) -> np.ndarray:
+        vector = np.array(vector, dtype=np.float32)
+        vector.flags.writeable = False
+        expires_at = time.monotonic() + self.ttl if self.ttl else 0.0
+        self._entries[key] = (expires_at, vector)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return vector
+
+    def clear(self):
+        self._entries.clear()
+
+    async def close(self):
+        if self.backend is not None:
+            await self.backend.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.backend_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "backend_hits": self.backend_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": (self.hits + self.backend_hits) / lookups if lookups else 0.0,
+            "shared_backend": self.backend is not None
+        }
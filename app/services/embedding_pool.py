@@ -0,0 +1,305 @@
+import logging
+import multiprocessing as mp
+import os
+import queue
+import threading
+from collections import deque
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+from .embedding_backends import EmbeddingBackend, create_backend
+
+logger = logging.getLogger(__name__)
+
+
+def _worker_main(backend_name: str, model_name: str, threads: int, cpus: Optional[List[int]], conn):
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["EMBEDDING_NUM_THREADS"] = str(threads)
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+
+    try:
+        if backend_name == "torch":
+            import torch
+            torch.set_num_threads(threads)
+        backend = create_backend(backend_name, model_name, "cpu").load()
+        vector_size = len(backend.encode("test"))
+    except Exception as e:
+        conn.send(("error", str(e)))
+        return
+    conn.send(("ready", vector_size))
+
+    shm = None
+    output = None
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+
+        command = message[0]
+        if command == "encode":
+            try:
+                embeddings = backend.encode_tokens(message[1])
+                output[:len(embeddings)] = embeddings
+                conn.send(("ok", len(embeddings)))
+            except Exception as e:
+                conn.send(("error", str(e)))
+        elif command == "ping":
+            conn.send(("pong", os.getpid()))
+        elif command == "attach":
+            shm = shared_memory.SharedMemory(name=message[1])
+            output = np.ndarray((message[2], vector_size), dtype=np.float32, buffer=shm.buf)
+            conn.send(("ok", 0))
+        elif command == "stop":
+            break
+
+    output = None
+    if shm is not None:
+        shm.close()
+
+
+class _Worker:
+
+    def __init__(self, index: int):
+        self.index = index
+        self.process = None
+        self.conn = None
+        self.shm = None
+        self.output = None
+
+
+class EmbeddingWorkerPool(EmbeddingBackend):
+    name = "pool"
+
+    def __init__(self, backend_name: str, model_name: str, workers: int):
+        super().__init__(model_name, "cpu")
+        self.backend_name = backend_name
+        self.tokenizer_backend = create_backend(backend_name, model_name, "cpu")
+        self.worker_count = max(1, workers)
+        cpu_count = os.cpu_count() or 1
+        self.threads = int(os.getenv("EMBEDDING_POOL_THREADS", 0)) or max(1, cpu_count // self.worker_count)
+        self.pin_cpus = os.getenv("EMBEDDING_POOL_PIN_CPUS", "true").lower() == "true"
+        self.start_timeout = float(os.getenv("EMBEDDING_POOL_START_TIMEOUT", 600))
+        self.request_timeout = float(os.getenv("EMBEDDING_POOL_TIMEOUT", 120))
+        self.health_interval = float(os.getenv("EMBEDDING_POOL_HEALTH_INTERVAL", 30))
+        self.vector_size = None
+        self.restarts = 0
+        self._ctx = mp.get_context("spawn")
+        self._workers: List[_Worker] = []
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._stop = threading.Event()
+        self._monitor = None
+
+    def load(self):
+        self.tokenizer_backend.load_tokenizer()
+        self.tokenizer = self.tokenizer_backend.tokenizer
+        self.max_seq_length = self.tokenizer_backend.max_seq_length
+
+        logger.info(f"Запускаю {self.worker_count} процессов кодирования ({self.backend_name}, {self.threads} потоков)")
+        try:
+            for index in range(self.worker_count):
+                worker = _Worker(index)
+                self._workers.append(worker)
+                self._start(worker)
+                self._idle.put(worker)
+        except Exception:
+            self.close()
+            raise
+
+        self._monitor = threading.Thread(target=self._monitor_loop, name="embedding-pool-monitor", daemon=True)
+        self._monitor.start()
+        return self
+
+    def tokenize(self, texts: List[str]) -> Dict[str, np.ndarray]:
+        return self.tokenizer_backend.tokenize(texts)
+
+    def _cpus_for(self, index: int) -> Optional[List[int]]:
+        if not self.pin_cpus or not hasattr(os, "sched_getaffinity"):
+            return None
+        available = sorted(os.sched_getaffinity(0))
+        if len(available) < self.worker_count * self.threads:
+            return None
+        return available[index * self.threads:(index + 1) * self.threads]
+
+    def _start(self, worker: _Worker):
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(self.backend_name, self.model_name, self.threads, self._cpus_for(worker.index), child_conn),
+            name=f"embedding-worker-{worker.index}",
+            daemon=True
+        )
+        try:
+            process.start()
+        finally:
+            child_conn.close()
+        worker.process = process
+        worker.conn = parent_conn
+
+        if not parent_conn.poll(self.start_timeout):
+            worker.process.terminate()
+            raise RuntimeError(f"Процесс кодирования {worker.index} не запустился за {self.start_timeout} с")
+        status, value = parent_conn.recv()
+        if status != "ready":
+            raise RuntimeError(f"Процесс кодирования {worker.index} не смог загрузить модель: {value}")
+        self.vector_size = value
+
+        if worker.shm is None:
+            worker.shm = shared_memory.SharedMemory(create=True, size=self.batch_size * value * 4)
+            worker.output = np.ndarray((self.batch_size, value), dtype=np.float32, buffer=worker.shm.buf)
+        parent_conn.send(("attach", worker.shm.name, self.batch_size))
+        parent_conn.recv()
+        logger.info(f"Процесс кодирования {worker.index} готов (pid {worker.process.pid})")
+
+    def _restart(self, worker: _Worker, reason: str):
+        self.restarts += 1
+        logger.warning(f"Перезапускаю процесс кодирования {worker.index}: {reason}")
+        if worker.process is not None and worker.process.is_alive():
+            worker.process.terminate()
+            worker.process.join(5)
+        if worker.conn is not None:
+            worker.conn.close()
+        self._start(worker)
+
+    def _receive(self, worker: _Worker) -> np.ndarray:
+        if not worker.conn.poll(self.request_timeout):
+            raise TimeoutError(f"Процесс кодирования {worker.index} не ответил за {self.request_timeout} с")
+        status, value = worker.conn.recv()
+        if status != "ok":
+            raise RuntimeError(f"Ошибка в процессе кодирования {worker.index}: {value}")
+        return np.array(worker.output[:value])
+
+    def _retry(self, worker: _Worker, features: Dict[str, np.ndarray], error: Exception) -> np.ndarray:
+        self._restart(worker, str(error) or type(error).__name__)
+        worker.conn.send(("encode", features))
+        return self._receive(worker)
+
+    def _send(self, worker: _Worker, features: Dict[str, np.ndarray]):
+        try:
+            worker.conn.send(("encode", features))
+            return None
+        except (EOFError, OSError) as e:
+            return e
+
+    def _collect(self, worker: _Worker, features: Dict[str, np.ndarray], send_error) -> np.ndarray:
+        try:
+            if send_error is not None:
+                return self._retry(worker, features, send_error)
+            try:
+                return self._receive(worker)
+            except (EOFError, OSError, TimeoutError) as e:
+                return self._retry(worker, features, e)
+        finally:
+            self._idle.put(worker)
+
+    def encode(self, text: Union[str, List[str]], **kwargs) -> np.ndarray:
+        single = isinstance(text, str)
+        texts = [text] if single else list(text)
+        if not texts:
+            return np.zeros((0, self.vector_size or 0), dtype=np.float32)
+
+        order = sorted(range(len(texts)), key=lambda i: -len(texts[i]))
+        chunks = [order[start:start + self.batch_size] for start in range(0, len(order), self.batch_size)]
+        results: List[Optional[np.ndarray]] = [None] * len(chunks)
+        pending = deque()
+
+        try:
+            for position, chunk in enumerate(chunks):
+                features = self.tokenize([texts[i] for i in chunk])
+                worker = None
+                while worker is None:
+                    try:
+                        worker = self._idle.get_nowait()
+                    except queue.Empty:
+                        if pending:
+                            done = pending.popleft()
+                            results[done[1]] = self._collect(done[0], done[2], done[3])
+                        else:
+                            worker = self._idle.get()
+                pending.append((worker, position, features, self._send(worker, features)))
+
+            while pending:
+                done = pending.popleft()
+                results[done[1]] = self._collect(done[0], done[2], done[3])
+        finally:
+            while pending:
+                worker, _, _, send_error = pending.popleft()
+                try:
+                    if send_error is None:
+                        self._receive(worker)
+                except Exception:
+                    pass
+                self._idle.put(worker)
+
+        sorted_embeddings = np.concatenate(results, axis=0)
+        embeddings = np.empty_like(sorted_embeddings)
+        embeddings[order] = sorted_embeddings
+        return embeddings[0] if single else embeddings
+
+    def encode_tokens(self, features: Dict[str, np.ndarray]) -> np.ndarray:
+        worker = self._idle.get()
+        return self._collect(worker, features, self._send(worker, features))
+
+    def _check_worker(self, worker: _Worker):
+        try:
+            if not worker.process.is_alive():
+                raise RuntimeError(f"процесс завершился с кодом {worker.process.exitcode}")
+            worker.conn.send(("ping",))
+            if not worker.conn.poll(5):
+                raise TimeoutError("нет ответа на ping")
+            worker.conn.recv()
+        except Exception as e:
+            try:
+                self._restart(worker, str(e) or type(e).__name__)
+            except Exception as restart_error:
+                logger.error(f"Не удалось перезапустить процесс кодирования {worker.index}: {restart_error}")
+
+    def health_check(self):
+        checked = []
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._check_worker(worker)
+            checked.append(worker)
+        for worker in checked:
+            self._idle.put(worker)
+
+    def _monitor_loop(self):
+        while not self._stop.wait(self.health_interval):
+            self.health_check()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.worker_count,
+            "alive": sum(1 for worker in self._workers if worker.process is not None and worker.process.is_alive()),
+            "idle": self._idle.qsize(),
+            "threads_per_worker": self.threads,
+            "restarts": self.restarts
+        }
+
+    def close(self):
+        self._stop.set()
+        for worker in self._workers:
+            try:
+                if worker.conn is not None:
+                    worker.conn.send(("stop",))
+            except Exception:
+                pass
+        for worker in self._workers:
+            if worker.process is not None:
+                worker.process.join(5)
+                if worker.process.is_alive():
+                    worker.process.terminate()
+                    worker.process.join(5)
+            if worker.conn is not None:
+                worker.conn.close()
+            worker.output = None
+            if worker.shm is not None:
+                worker.shm.close()
+                worker.shm.unlink()
+        self._workers = []
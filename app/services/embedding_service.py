@@ -1,47 +1,125 @@
-from sentence_transformers import SentenceTransformer
 import numpy as np
-from typing import List, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Union
+import asyncio
+import functools
 import os
 import logging
-import torch
+import time
+
+from .embedding_backends import create_backend
+from .embedding_batcher import EmbeddingBatcher
+from .embedding_pool import EmbeddingWorkerPool
+from .embedding_cache import EmbeddingCache, RedisEmbeddingCacheBackend
+from .metrics import timed
 
 logger = logging.getLogger(__name__)
+hot_logger = logging.getLogger(f"{__name__}.hot")
 
 class EmbeddingService:
     
     def __init__(self, model_name: str = None):
         self.model_name = model_name or os.getenv("EMBEDDING_MODEL", "intfloat/multilingual-e5-large")
+        self.backend_name = os.getenv("EMBEDDING_BACKEND", "torch").lower()
         self.model = None
         self.vector_size = None
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.device = "cpu"
+        if self.backend_name == "torch":
+            import torch
+            if torch.cuda.is_available():
+                self.device = "cuda"
+        self.pool_workers = int(os.getenv("EMBEDDING_POOL_WORKERS", 0))
+        self.executor_workers = max(int(os.getenv("EMBEDDING_EXECUTOR_WORKERS", 1)), self.pool_workers)
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.executor_workers,
+            thread_name_prefix="embedding"
+        )
+        self.bulk_batch_size = int(os.getenv("EMBEDDING_BULK_BATCH_SIZE", 64))
+        self.batcher = None
+        if os.getenv("EMBEDDING_BATCHING", "true").lower() == "true":
+            self.batcher = EmbeddingBatcher(
+                self._encode_batch,
+                max_batch_size=int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", 32)),
+                max_wait_ms=float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", 5)),
+                max_concurrency=self.executor_workers
+            )
+        self.query_cache = None
+        cache_size = int(os.getenv("EMBEDDING_CACHE_SIZE", 10000))
+        if cache_size > 0:
+            cache_ttl = float(os.getenv("EMBEDDING_CACHE_TTL", 0))
+            redis_url = os.getenv("EMBEDDING_CACHE_REDIS_URL")
+            self.query_cache = EmbeddingCache(
+                max_size=cache_size,
+                ttl=cache_ttl,
+                backend=RedisEmbeddingCacheBackend(
+                    redis_url,
+                    ttl=cache_ttl,
+                    prefix=f"ltm:emb:{self.backend_name}:"
+                ) if redis_url else None
+            )
+        self.warmup_lengths = [int(x) for x in os.getenv("EMBEDDING_WARMUP_LENGTHS", "16,128,512").split(",") if x.strip()]
+        self.warmup_batch_size = max(1, int(os.getenv("EMBEDDING_WARMUP_BATCH_SIZE", 8)))
+        self.timings: Dict[str, float] = {}
+        self.passage_cache = None
+        passage_cache_size = int(os.getenv("EMBEDDING_PASSAGE_CACHE_SIZE", 0))
+        if passage_cache_size > 0:
+            self.passage_cache = EmbeddingCache(max_size=passage_cache_size)
     
     async def initialize(self):
         try:
             logger.info(f"Загружаю модель эмбеддингов: {self.model_name}")
-            logger.info(f"Устройство: {self.device}")
+            logger.info(f"Бэкенд: {self.backend_name}, устройство: {self.device}")
             if self.device == "cuda":
+                import torch
                 logger.info(f"CUDA доступна: {torch.cuda.get_device_name(0)}")
             
-            self.model = SentenceTransformer(self.model_name, device=self.device)
-            test_embedding = self.model.encode("test")
-            self.vector_size = len(test_embedding)
-            logger.info(f"Модель загружена успешно. Размер вектора: {self.vector_size}")
+            if self.pool_workers > 0:
+                backend = EmbeddingWorkerPool(self.backend_name, self.model_name, self.pool_workers)
+            else:
+                backend = create_backend(self.backend_name, self.model_name, self.device)
+            started = time.perf_counter()
+            model = await self._run_blocking(backend.load)
+            self.timings["model_load"] = time.perf_counter() - started
+
+            started = time.perf_counter()
+            self.vector_size = await self._run_blocking(self._warmup, model)
+            self.timings["warmup"] = time.perf_counter() - started
+            self.model = model
+            logger.info(
+                f"Модель загружена успешно. Размер вектора: {self.vector_size}, "
+                f"загрузка {self.timings['model_load']:.2f} с, прогрев {self.timings['warmup']:.2f} с"
+            )
         except Exception as e:
             logger.error(f"Ошибка при загрузке модели: {e}")
             raise
     
+    def _warmup(self, model) -> int:
+        embedding = model.encode("test")
+        for length in self.warmup_lengths:
+            started = time.perf_counter()
+            text = self.build_passage_text(" ".join(["тест"] * max(1, length)))
+            model.encode([text] * self.warmup_batch_size)
+            logger.info(f"Прогрев: {self.warmup_batch_size} x ~{length} токенов за {time.perf_counter() - started:.2f} с")
+        return int(embedding.shape[-1])
+
+    @staticmethod
+    def build_passage_text(content: str, context: str = None) -> str:
+        if context:
+            return f"passage: {content} context: {context}"
+        return f"passage: {content}"
+
+    @staticmethod
+    def build_query_text(query: str) -> str:
+        return f"query: {query}"
+
     def encode_text_with_context(self, content: str, context: str = None) -> np.ndarray:
         if self.model is None:
             raise RuntimeError("Модель не инициализирована. Вызовите initialize() сначала.")
         
         try:
             if context:
-                combined_text = f"passage: {content} context: {context}"
-                logger.info(f"Кодирую документ с контекстом: {content[:50]}...")
-                return self.encode_text(combined_text)
-            else:
-                prefixed_content = f"passage: {content}"
-                return self.encode_text(prefixed_content)
+                hot_logger.info("Кодирую документ с контекстом: %.50s...", content)
+            return self.encode_text(self.build_passage_text(content, context))
         except Exception as e:
             logger.error(f"Ошибка при создании составного эмбеддинга: {e}")
             raise
@@ -51,12 +129,138 @@ class EmbeddingService:
             raise RuntimeError("Модель не инициализирована. Вызовите initialize() сначала.")
         
         try:
-            prefixed_query = f"query: {query}"
-            logger.info(f"Кодирую запрос: {query}")
-            return self.encode_text(prefixed_query)
+            hot_logger.info("Кодирую запрос: %.100s", query)
+            return self.encode_text(self.build_query_text(query))
         except Exception as e:
             logger.error(f"Ошибка при создании эмбеддинга запроса: {e}")
             raise
+
+    async def _run_blocking(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+
+    @timed("embedding.passage")
+    async def embed_passage(self, content: str, context: str = None, cache_key: Optional[str] = None) -> np.ndarray:
+        if cache_key is None or self.passage_cache is None:
+            return await self._embed_passage_uncached(content, context)
+
+        embedding = await self.passage_cache.get(cache_key)
+        if embedding is None:
+            embedding = await self._embed_passage_uncached(content, context)
+            await self.passage_cache.set(cache_key, embedding)
+        return embedding
+
+    async def _embed_passage_uncached(self, content: str, context: str = None) -> np.ndarray:
+        if self.batcher is None:
+            return await self._run_blocking(self.encode_text_with_context, content, context)
+        if self.model is None:
+            raise RuntimeError("Модель не инициализирована. Вызовите initialize() сначала.")
+        return await self.batcher.submit(self.build_passage_text(content, context))
+
+    @timed("embedding.query")
+    async def embed_query(self, query: str) -> np.ndarray:
+        if self.query_cache is None:
+            return await self._embed_query_uncached(query)
+
+        key = EmbeddingCache.make_key(self.model_name, self.build_query_text(query))
+        embedding = await self.query_cache.get(key)
+        if embedding is None:
+            embedding = await self._embed_query_uncached(query)
+            await self.query_cache.set(key, embedding)
+        return embedding
+
+    async def _embed_query_uncached(self, query: str) -> np.ndarray:
+        if self.batcher is None:
+            return await self._run_blocking(self.encode_query, query)
+        if self.model is None:
+            raise RuntimeError("Модель не инициализирована. Вызовите initialize() сначала.")
+        hot_logger.info("Кодирую запрос: %.100s", query)
+        return await self.batcher.submit(self.build_query_text(query))
+
+    @timed("embedding.queries", batch_arg=1)
+    async def embed_queries(self, queries: List[str]) -> np.ndarray:
+        if self.model is None:
+            raise RuntimeError("Модель не инициализирована. Вызовите initialize() сначала.")
+
+        texts = [self.build_query_text(query) for query in queries]
+        if self.query_cache is None:
+            hot_logger.info("Кодирую %d запросов одним пакетом", len(queries))
+            return await self._encode_batch(texts)
+
+        keys = [EmbeddingCache.make_key(self.model_name, text) for text in texts]
+        embeddings = [await self.query_cache.get(key) for key in keys]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            hot_logger.info("Кодирую %d из %d запросов одним пакетом", len(missing), len(queries))
+            vectors = await self._encode_batch([texts[i] for i in missing])
+            for i, vector in zip(missing, vectors):
+                await self.query_cache.set(keys[i], vector)
+                embeddings[i] = vector
+        return np.stack(embeddings)
+
+    @timed("embedding.passages", batch_arg=1)
+    async def embed_passages(
+        self,
+        items: List[Tuple[str, Optional[str]]],
+        cache_keys: Optional[List[str]] = None
+    ) -> Tuple[List[Optional[np.ndarray]], Dict[int, str]]:
+        if self.model is None:
+            raise RuntimeError("Модель не инициализирована. Вызовите initialize() сначала.")
+
+        texts = [self.build_passage_text(content, context) for content, context in items]
+        embeddings: List[Optional[np.ndarray]] = [None] * len(texts)
+        errors: Dict[int, str] = {}
+
+        use_cache = cache_keys is not None and self.passage_cache is not None
+        if use_cache:
+            for i, key in enumerate(cache_keys):
+                embeddings[i] = await self.passage_cache.get(key)
+
+        order = sorted(
+            (i for i in range(len(texts)) if embeddings[i] is None),
+            key=lambda i: len(texts[i])
+        )
+
+        for start in range(0, len(order), self.bulk_batch_size):
+            chunk = order[start:start + self.bulk_batch_size]
+            try:
+                vectors = await self._encode_batch([texts[i] for i in chunk])
+            except Exception as e:
+                logger.error(f"Ошибка при пакетном кодировании документов: {e}")
+                for i in chunk:
+                    errors[i] = str(e)
+                continue
+            for i, vector in zip(chunk, vectors):
+                embeddings[i] = vector
+                if use_cache:
+                    await self.passage_cache.set(cache_keys[i], vector)
+
+        return embeddings, errors
+
+    @timed("embedding.encode_batch", batch_arg=1)
+    async def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        return await self._run_blocking(self.encode_text, texts)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "model_name": self.model_name,
+            "backend": self.backend_name,
+            "device": self.device,
+            "vector_size": self.vector_size,
+            "batching": self.batcher.get_stats() if self.batcher is not None else None,
+            "pool": self.model.get_stats() if isinstance(self.model, EmbeddingWorkerPool) else None,
+            "query_cache": self.query_cache.get_stats() if self.query_cache is not None else None,
+            "passage_cache": self.passage_cache.get_stats() if self.passage_cache is not None else None
+        }
+
+    async def close(self):
+        if self.batcher is not None:
+            await self.batcher.close()
+        if self.query_cache is not None:
+            await self.query_cache.close()
+        if isinstance(self.model, EmbeddingWorkerPool):
+            await self._run_blocking(self.model.close)
+        self.executor.shutdown(wait=False)
  
     def encode_text(self, text: Union[str, List[str]]) -> np.ndarray:
         if self.model is None:
@@ -0,0 +1,110 @@
+from collections import Counter
+from typing import Any, BinaryIO, Dict, Optional, Tuple
+import asyncio
+import base64
+import binascii
+import math
+
+from .blob_store import BlobStore
+from .face_store import create_face_store
+from .metrics import timed
+
+IMAGE_SIGNATURES = [
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp")
+]
+
+
+class FaceService:
+    def __init__(self):
+        self.store = create_face_store()
+        self.blob_store = BlobStore()
+
+    @staticmethod
+    def _sniff_media_type(data: bytes) -> str:
+        for signature, media_type in IMAGE_SIGNATURES:
+            if data.startswith(signature):
+                return media_type
+        if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+            return "image/webp"
+        return "application/octet-stream"
+
+    @classmethod
+    def _decode_image(cls, image: str) -> Tuple[bytes, Dict[str, str]]:
+        prefix = ""
+        payload = image
+        media_type = None
+        if image.startswith("data:") and ";base64," in image[:256]:
+            header, payload = image.split(",", 1)
+            prefix = header + ","
+            media_type = header[5:].split(";")[0] or None
+
+        try:
+            data = base64.b64decode(payload, validate=True)
+            if base64.b64encode(data).decode("ascii") == payload:
+                return data, {
+                    "encoding": "base64",
+                    "prefix": prefix,
+                    "media_type": media_type or cls._sniff_media_type(data)
+                }
+        except (binascii.Error, ValueError):
+            pass
+        return image.encode("utf-8"), {"encoding": "text", "prefix": "", "media_type": "text/plain"}
+
+    async def _register(self, user_id: str, name: str, image_id: str, meta: Dict[str, str]) -> str:
+        return await asyncio.to_thread(self.store.add, user_id, name, image_id, meta)
+
+    @timed("face.add")
+    async def add_face(self, user_id: str, name: str, image: str):
+        data, meta = await asyncio.to_thread(self._decode_image, image)
+        image_id = await asyncio.to_thread(self.blob_store.put, data)
+        return await self._register(user_id, name, image_id, meta)
+
+    @timed("face.add_stream")
+    async def add_face_stream(self, user_id: str, name: str, source: BinaryIO, media_type: Optional[str] = None):
+        image_id, _ = await asyncio.to_thread(self.blob_store.put_stream, source)
+        if not media_type or media_type == "application/octet-stream":
+            with open(self.blob_store.path(image_id), "rb") as f:
+                media_type = self._sniff_media_type(f.read(16))
+        return await self._register(user_id, name, image_id, {
+            "encoding": "base64",
+            "prefix": "",
+            "media_type": media_type
+        })
+
+    async def get_image_base64(self, face: Dict[str, Any]) -> str:
+        data = await asyncio.to_thread(self.blob_store.read, face["image_id"])
+        if face["encoding"] == "text":
+            return data.decode("utf-8")
+        encoded = await asyncio.to_thread(base64.b64encode, data)
+        return face["prefix"] + encoded.decode("ascii")
+
+    def close(self):
+        self.store.close()
+
+    def image_path(self, face: Dict[str, Any]) -> str:
+        return self.blob_store.path(face["image_id"])
+
+    @staticmethod
+    def cosine_similarity(a: str, b: str) -> float:
+        a_words = Counter(a.lower().split())
+        b_words = Counter(b.lower().split())
+        all_words = set(a_words) | set(b_words)
+        v1 = [a_words.get(w, 0) for w in all_words]
+        v2 = [b_words.get(w, 0) for w in all_words]
+        dot = sum(x*y for x, y in zip(v1, v2))
+        norm1 = math.sqrt(sum(x*x for x in v1))
+        norm2 = math.sqrt(sum(x*x for x in v2))
+        if norm1 == 0 or norm2 == 0:
+            return 0.0
+        return dot / (norm1 * norm2)
+
+    @timed("face.find")
+    async def find_face(self, user_id: str, query: str, min_score: float = 0.7) -> Optional[Dict]:
+        best, best_score = await asyncio.to_thread(self.store.best_match, user_id, query)
+        if best and best_score >= min_score:
+            return {**best, "score": best_score}
+        return None
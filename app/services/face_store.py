@@ -0,0 +1,255 @@
+import math
+import os
+import sqlite3
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+FACE_STORES = ("memory", "sqlite")
+
+
+def tokenize(text: str) -> Counter:
+    return Counter(text.lower().split())
+
+
+def token_norm(counts: Counter) -> float:
+    return math.sqrt(sum(x*x for x in counts.values()))
+
+
+class FaceIndex:
+
+    def __init__(self):
+        self.faces: List[Dict[str, str]] = []
+        self.token_counts: List[Counter] = []
+        self.norms: List[float] = []
+        self.postings: Dict[str, List[int]] = {}
+
+    @staticmethod
+    def tokenize(text: str) -> Counter:
+        return tokenize(text)
+
+    def add(self, face: Dict[str, str]):
+        position = len(self.faces)
+        counts = self.tokenize(face["name"])
+        self.faces.append(face)
+        self.token_counts.append(counts)
+        self.norms.append(token_norm(counts))
+        for token in counts:
+            self.postings.setdefault(token, []).append(position)
+
+    def best_match(self, query: str):
+        query_counts = self.tokenize(query)
+        query_norm = token_norm(query_counts)
+        if query_norm == 0:
+            return None, 0.0
+
+        dots: Dict[int, int] = {}
+        for token, count in query_counts.items():
+            for position in self.postings.get(token, ()):
+                dots[position] = dots.get(position, 0) + count * self.token_counts[position][token]
+
+        best = None
+        best_score = 0.0
+        for position in sorted(dots):
+            score = dots[position] / (self.norms[position] * query_norm)
+            if score > best_score:
+                best_score = score
+                best = self.faces[position]
+        return best, best_score
+
+    def __len__(self) -> int:
+        return len(self.faces)
+
+
+class FaceStore:
+    name = "base"
+
+    def add(self, user_id: str, name: str, image_id: str, meta: Dict[str, str]) -> str:
+        raise NotImplementedError
+
+    def best_match(self, user_id: str, query: str) -> Tuple[Optional[Dict[str, str]], float]:
+        raise NotImplementedError
+
+    def count(self, user_id: Optional[str] = None) -> int:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class MemoryFaceStore(FaceStore):
+    name = "memory"
+
+    def __init__(self):
+        self.faces: Dict[str, FaceIndex] = {}
+        self.counter = 0
+        self._lock = threading.Lock()
+
+    def add(self, user_id: str, name: str, image_id: str, meta: Dict[str, str]) -> str:
+        with self._lock:
+            self.counter += 1
+            face_id = str(self.counter)
+            if user_id not in self.faces:
+                self.faces[user_id] = FaceIndex()
+            self.faces[user_id].add({
+                "id": face_id,
+                "name": name,
+                "image_id": image_id,
+                **meta
+            })
+        return face_id
+
+    def best_match(self, user_id: str, query: str) -> Tuple[Optional[Dict[str, str]], float]:
+        with self._lock:
+            index = self.faces.get(user_id)
+            if index is None:
+                return None, 0.0
+            return index.best_match(query)
+
+    def count(self, user_id: Optional[str] = None) -> int:
+        with self._lock:
+            if user_id is not None:
+                return len(self.faces.get(user_id, ()))
+            return sum(len(index) for index in self.faces.values())
+
+
+class SqliteFaceStore(FaceStore):
+    QUERY_CHUNK_SIZE = 500
+    name = "sqlite"
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS faces (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            name TEXT NOT NULL,
+            image_id TEXT NOT NULL,
+            encoding TEXT NOT NULL,
+            prefix TEXT NOT NULL,
+            media_type TEXT NOT NULL,
+            norm REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS face_tokens (
+            user_id TEXT NOT NULL,
+            token TEXT NOT NULL,
+            face_id INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (user_id, token, face_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS faces_user_idx ON faces (user_id);
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv("FACE_STORE_PATH", "data/faces.db")
+        self.busy_timeout = float(os.getenv("FACE_STORE_BUSY_TIMEOUT", 30))
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        connection = self._connection()
+        with connection:
+            connection.executescript(self.SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None, check_same_thread=False)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    @staticmethod
+    def _to_face(row: sqlite3.Row) -> Dict[str, str]:
+        return {
+            "id": str(row["id"]),
+            "name": row["name"],
+            "image_id": row["image_id"],
+            "encoding": row["encoding"],
+            "prefix": row["prefix"],
+            "media_type": row["media_type"]
+        }
+
+    def add(self, user_id: str, name: str, image_id: str, meta: Dict[str, str]) -> str:
+        counts = tokenize(name)
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = connection.execute(
+                "INSERT INTO faces (user_id, name, image_id, encoding, prefix, media_type, norm) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (user_id, name, image_id, meta["encoding"], meta["prefix"], meta["media_type"], token_norm(counts))
+            )
+            face_id = cursor.lastrowid
+            connection.executemany(
+                "INSERT INTO face_tokens (user_id, token, face_id, count) VALUES (?, ?, ?, ?)",
+                [(user_id, token, face_id, count) for token, count in counts.items()]
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return str(face_id)
+
+    def best_match(self, user_id: str, query: str) -> Tuple[Optional[Dict[str, str]], float]:
+        query_counts = tokenize(query)
+        query_norm = token_norm(query_counts)
+        if query_norm == 0:
+            return None, 0.0
+
+        tokens = list(query_counts)
+        connection = self._connection()
+        rows = []
+        for start in range(0, len(tokens), self.QUERY_CHUNK_SIZE):
+            chunk = tokens[start:start + self.QUERY_CHUNK_SIZE]
+            placeholders = ", ".join("?" for _ in chunk)
+            rows.extend(connection.execute(
+                f"SELECT t.face_id, t.token, t.count, f.norm FROM face_tokens t JOIN faces f ON f.id = t.face_id "
+                f"WHERE t.user_id = ? AND t.token IN ({placeholders})",
+                [user_id, *chunk]
+            ).fetchall())
+
+        dots: Dict[int, int] = {}
+        norms: Dict[int, float] = {}
+        for face_id, token, count, norm in rows:
+            dots[face_id] = dots.get(face_id, 0) + query_counts[token] * count
+            norms[face_id] = norm
+
+        best_id = None
+        best_score = 0.0
+        for face_id in sorted(dots):
+            score = dots[face_id] / (norms[face_id] * query_norm)
+            if score > best_score:
+                best_score = score
+                best_id = face_id
+        if best_id is None:
+            return None, 0.0
+
+        row = self._connection().execute("SELECT * FROM faces WHERE id = ?", (best_id,)).fetchone()
+        return self._to_face(row), best_score
+
+    def count(self, user_id: Optional[str] = None) -> int:
+        if user_id is not None:
+            row = self._connection().execute("SELECT COUNT(*) FROM faces WHERE user_id = ?", (user_id,)).fetchone()
+        else:
+            row = self._connection().execute("SELECT COUNT(*) FROM faces").fetchone()
+        return row[0]
+
+    def close(self):
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections = []
+        self._local = threading.local()
+
+
+def create_face_store(name: str = None) -> FaceStore:
+    name = name or os.getenv("FACE_STORE", "memory")
+    if name == "memory":
+        return MemoryFaceStore()
+    if name == "sqlite":
+        return SqliteFaceStore()
+    raise ValueError(f"Неизвестное хранилище лиц: {name}. Доступны: {', '.join(FACE_STORES)}")
@@ -0,0 +1,284 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .metrics import timed
+
+logger = logging.getLogger(__name__)
+
+
+class _HotUser:
+
+    def __init__(self, vector_size: int, capacity: int):
+        self.matrix = np.zeros((max(1, capacity), vector_size), dtype=np.float32)
+        self.size = 0
+        self.ids: List[str] = []
+        self.positions: Dict[str, int] = {}
+        self.payloads: List[Dict[str, Any]] = []
+        self.payload_bytes = 0
+        self.loaded_at = time.monotonic()
+
+    @property
+    def nbytes(self) -> int:
+        return self.matrix.nbytes + self.payload_bytes
+
+    @staticmethod
+    def _payload_size(payload: Dict[str, Any]) -> int:
+        return sum(len(value) for value in payload.values() if isinstance(value, str)) + 64
+
+    def upsert(self, point_id: str, vector: np.ndarray, payload: Dict[str, Any]):
+        position = self.positions.get(point_id)
+        if position is None:
+            if self.size == len(self.matrix):
+                grown = np.zeros((len(self.matrix) * 2, self.matrix.shape[1]), dtype=np.float32)
+                grown[:self.size] = self.matrix[:self.size]
+                self.matrix = grown
+            position = self.size
+            self.size += 1
+            self.ids.append(point_id)
+            self.payloads.append(payload)
+            self.positions[point_id] = position
+        else:
+            self.payload_bytes -= self._payload_size(self.payloads[position])
+            self.payloads[position] = payload
+        self.payload_bytes += self._payload_size(payload)
+        norm = np.linalg.norm(vector)
+        self.matrix[position] = vector / norm if norm > 0 else vector
+
+    def touch(self, point_id: str, value: str):
+        position = self.positions.get(point_id)
+        if position is not None:
+            self.payloads[position] = {**self.payloads[position], "time": value}
+
+    def search(self, query: np.ndarray, limit: int, min_score: float) -> List[Dict[str, Any]]:
+        if self.size == 0 or limit <= 0:
+            return []
+        scores = self.matrix[:self.size] @ query
+        if self.size > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            top = np.arange(self.size)
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        results = []
+        for position in top:
+            score = float(scores[position])
+            if score < min_score:
+                break
+            payload = self.payloads[position]
+            results.append({
+                "score": score,
+                "user_id": payload.get("user_id", ""),
+                "content": payload.get("content", ""),
+                "context": payload.get("context"),
+                "time": payload.get("time")
+            })
+        return results
+
+
+class HotUserCache:
+
+    def __init__(self, qdrant_service):
+        self.qdrant_service = qdrant_service
+        self.enabled = os.getenv("HOT_USER_CACHE", "false").lower() == "true"
+        self.workers = int(os.getenv("WORKERS") or os.getenv("WEB_CONCURRENCY") or 1)
+        if self.enabled and self.workers > 1 and os.getenv("HOT_USER_CACHE_MULTI_WORKER", "false").lower() != "true":
+            logger.warning(
+                f"Горячий кэш пользователей отключен: {self.workers} воркеров не видят записи друг друга. "
+                f"Включить принудительно: HOT_USER_CACHE_MULTI_WORKER=true"
+            )
+            self.enabled = False
+        self.max_users = int(os.getenv("HOT_USER_MAX_USERS", 1000))
+        self.max_bytes = int(float(os.getenv("HOT_USER_MAX_MEMORY_MB", 256)) * 1024 * 1024)
+        self.max_points = int(os.getenv("HOT_USER_MAX_POINTS", 2000))
+        self.promote_after = max(1, int(os.getenv("HOT_USER_PROMOTE_AFTER", 2)))
+        self.ttl = float(os.getenv("HOT_USER_TTL", 300))
+        self.vector_size: Optional[int] = None
+        self._users: "OrderedDict[str, _HotUser]" = OrderedDict()
+        self._misses_by_user: "OrderedDict[str, int]" = OrderedDict()
+        self._too_large: "OrderedDict[str, float]" = OrderedDict()
+        self._loading: Dict[str, List[tuple]] = {}
+        self._tasks = set()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.load_errors = 0
+        self.evictions = 0
+
+    def _get(self, user_id: str) -> Optional[_HotUser]:
+        entry = self._users.get(user_id)
+        if entry is None:
+            return None
+        if self.ttl > 0 and time.monotonic() - entry.loaded_at > self.ttl:
+            self._drop(user_id)
+            return None
+        self._users.move_to_end(user_id)
+        return entry
+
+    def _drop(self, user_id: str):
+        entry = self._users.pop(user_id, None)
+        if entry is not None:
+            self.bytes -= entry.nbytes
+
+    def _is_too_large(self, user_id: str) -> bool:
+        marked_at = self._too_large.get(user_id)
+        if marked_at is None:
+            return False
+        if self.ttl > 0 and time.monotonic() - marked_at > self.ttl:
+            del self._too_large[user_id]
+            return False
+        return True
+
+    def _enforce_limits(self):
+        while self._users and (len(self._users) > self.max_users or self.bytes > self.max_bytes):
+            user_id, entry = self._users.popitem(last=False)
+            self.bytes -= entry.nbytes
+            self.evictions += 1
+
+    def _record_miss(self, user_id: str):
+        self.misses += 1
+        if user_id in self._loading or self._is_too_large(user_id):
+            return
+        count = self._misses_by_user.pop(user_id, 0) + 1
+        if count < self.promote_after:
+            self._misses_by_user[user_id] = count
+            while len(self._misses_by_user) > self.max_users * 4:
+                self._misses_by_user.popitem(last=False)
+            return
+
+        self._loading[user_id] = []
+        task = asyncio.get_running_loop().create_task(self._load(user_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _load(self, user_id: str):
+        try:
+            records = []
+            async for batch in self.qdrant_service.iter_points(user_id=user_id, with_vectors=True, batch_size=256):
+                records.extend(batch)
+                if len(records) > self.max_points:
+                    self._too_large[user_id] = time.monotonic()
+                    while len(self._too_large) > self.max_users * 4:
+                        self._too_large.popitem(last=False)
+                    logger.info(f"Пользователь {user_id} не попадает в горячий кэш: больше {self.max_points} воспоминаний")
+                    return
+
+            if any(write[0] == "invalidate" for write in self._loading[user_id]):
+                logger.info(f"Загрузка пользователя {user_id} в горячий кэш отменена: данные изменились во время загрузки")
+                return
+            vector_size = self.vector_size or (len(records[0].vector) if records else 0)
+            if not vector_size:
+                return
+            entry = _HotUser(vector_size, len(records) + len(self._loading[user_id]))
+            for record in records:
+                entry.upsert(str(record.id), np.asarray(record.vector, dtype=np.float32), dict(record.payload or {}))
+            for write in self._loading[user_id]:
+                if write[0] == "upsert":
+                    entry.upsert(*write[1:])
+                elif write[0] == "touch":
+                    entry.touch(*write[1:])
+
+            self._users[user_id] = entry
+            self.bytes += entry.nbytes
+            self.loads += 1
+            self._enforce_limits()
+            logger.info(f"Пользователь {user_id} загружен в горячий кэш: {entry.size} воспоминаний")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.load_errors += 1
+            logger.error(f"Ошибка при загрузке пользователя {user_id} в горячий кэш: {e}")
+        finally:
+            self._loading.pop(user_id, None)
+
+    @timed("hot_users.search")
+    def search(
+        self,
+        user_id: str,
+        query_vector: np.ndarray,
+        limit: int,
+        min_score: float
+    ) -> Optional[List[Dict[str, Any]]]:
+        if not self.enabled:
+            return None
+        entry = self._get(user_id)
+        if entry is None:
+            self._record_miss(user_id)
+            return None
+        self.hits += 1
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        return entry.search(query / norm if norm > 0 else query, limit, min_score)
+
+    def add(self, user_id: str, point_id: str, vector: np.ndarray, payload: Dict[str, Any]):
+        if not self.enabled:
+            return
+        vector = np.asarray(vector, dtype=np.float32)
+        if user_id in self._loading:
+            self._loading[user_id].append(("upsert", point_id, vector, payload))
+        entry = self._users.get(user_id)
+        if entry is None:
+            return
+        if entry.size >= self.max_points and point_id not in entry.positions:
+            self._drop(user_id)
+            return
+        self.bytes -= entry.nbytes
+        entry.upsert(point_id, vector, payload)
+        self.bytes += entry.nbytes
+        self._enforce_limits()
+
+    def touch(self, user_id: str, point_ids: List[str], value: str):
+        if not self.enabled:
+            return
+        for point_id in point_ids:
+            if user_id in self._loading:
+                self._loading[user_id].append(("touch", point_id, value))
+            entry = self._users.get(user_id)
+            if entry is not None:
+                entry.touch(point_id, value)
+
+    def invalidate(self, user_id: str):
+        if user_id in self._loading:
+            self._loading[user_id].append(("invalidate",))
+        self._drop(user_id)
+        self._too_large.pop(user_id, None)
+
+    def clear(self):
+        self._users.clear()
+        self._misses_by_user.clear()
+        self._too_large.clear()
+        self.bytes = 0
+
+    async def close(self):
+        for task in list(self._tasks):
+            task.cancel()
+        for task in list(self._tasks):
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "workers": self.workers,
+            "users": len(self._users),
+            "points": sum(entry.size for entry in self._users.values()),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "loading": len(self._loading),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "loads": self.loads,
+            "load_errors": self.load_errors,
+            "evictions": self.evictions
+        }
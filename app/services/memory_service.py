@@ -1,28 +1,40 @@
-from typing import List, Dict, Optional
+from datetime import datetime
+from typing import Any, AsyncIterator, List, Dict, Optional, Union
+import json
 import logging
-from collections import Counter
-import math
+import os
+import time
+import numpy as np
 
+from .consolidation_service import ConsolidationService
 from .embedding_service import EmbeddingService
+from .hot_user_cache import HotUserCache
+from . import metrics
+from .metrics import timed
 from .qdrant_service import QdrantService
-from ..models.schemas import MemoryResponse
-
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('ltm.log'),
-        logging.StreamHandler()
-    ]
+from .search_cache import SearchCache
+from ..models.schemas import (
+    MemoryCreate, MemoryBatchItemResult, MemoryResponse, MemorySearch, MemorySearchGroup,
+    MemoryRecord, MemoryListResponse, MemoryImportResponse
 )
+
 logger = logging.getLogger(__name__)
+hot_logger = logging.getLogger(f"{__name__}.hot")
 
 class MemoryService:
     
     def __init__(self):
         self.embedding_service = EmbeddingService()
         self.qdrant_service = QdrantService()
+        self.hot_users = HotUserCache(self.qdrant_service)
+        self.search_cache = SearchCache()
+        self.consolidation = ConsolidationService(self.qdrant_service, self.hot_users, self.search_cache)
+        self.dedup = os.getenv("MEMORY_DEDUP", "false").lower() == "true"
+        self.import_max_line_bytes = int(os.getenv("MEMORY_IMPORT_MAX_LINE_BYTES", 1024 * 1024))
         self.initialized = False
+        self.phase = "pending"
+        self.startup_error: Optional[str] = None
+        self.startup_timings: Dict[str, float] = {}
     
     async def initialize(self):
         if self.initialized:
@@ -30,14 +42,83 @@ class MemoryService:
             
         try:
             logger.info("Инициализация сервиса памяти...")
-            await self.embedding_service.initialize()
-            await self.qdrant_service.initialize(1024)
+            started = time.perf_counter()
+            self.phase = "model"
+            if self.embedding_service.model is None:
+                await self.embedding_service.initialize()
+                self.startup_timings.update(self.embedding_service.timings)
+
+            self.phase = "qdrant"
+            qdrant_started = time.perf_counter()
+            await self.qdrant_service.initialize(self.embedding_service.vector_size)
+            self.startup_timings["qdrant"] = time.perf_counter() - qdrant_started
+
+            self.hot_users.vector_size = self.embedding_service.vector_size
+            self.consolidation.vector_size = self.embedding_service.vector_size
+            self.startup_timings["total"] = time.perf_counter() - started
+            self.phase = "ready"
+            self.startup_error = None
             self.initialized = True
-            logger.info("Сервис памяти успешно инициализирован")
+            self.consolidation.start()
+            logger.info(
+                "Сервис памяти успешно инициализирован за "
+                f"{self.startup_timings['total']:.2f} с ("
+                + ", ".join(f"{name}: {value:.2f} с" for name, value in self.startup_timings.items() if name != "total")
+                + ")"
+            )
         except Exception as e:
-            logger.error(f"Ошибка при инициализации сервиса памяти: {e}")
+            logger.error(f"Ошибка при инициализации сервиса памяти на этапе {self.phase}: {e}")
+            self.phase = "failed"
+            self.startup_error = str(e)
             raise
+
+    def get_readiness(self) -> Dict[str, Any]:
+        return {
+            "ready": self.initialized,
+            "phase": self.phase,
+            "timings": {name: round(value, 3) for name, value in self.startup_timings.items()},
+            "error": self.startup_error
+        }
+
+    async def close(self):
+        await self.consolidation.close()
+        await self.search_cache.close()
+        await self.hot_users.close()
+        await self.embedding_service.close()
+        await self.qdrant_service.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "initialized": self.initialized,
+            "startup": self.get_readiness(),
+            "embedding": self.embedding_service.get_stats(),
+            "hot_users": self.hot_users.get_stats(),
+            "search_cache": self.search_cache.get_stats(),
+            "consolidation": self.consolidation.get_stats()
+        }
     
+    def collect_metrics(self):
+        embedding = self.embedding_service.get_stats()
+        caches = {
+            "query": embedding["query_cache"],
+            "passage": embedding["passage_cache"],
+            "hot_users": self.hot_users.get_stats() if self.hot_users.enabled else None,
+            "search": self.search_cache.get_stats() if self.search_cache.enabled else None
+        }
+        for name, stats in caches.items():
+            if stats is None:
+                continue
+            metrics.CACHE_REQUESTS.set(stats["hits"] + stats.get("backend_hits", 0), name, "hit")
+            metrics.CACHE_REQUESTS.set(stats["misses"], name, "miss")
+            metrics.CACHE_HIT_RATIO.set(stats["hit_ratio"], name)
+
+        if embedding["batching"] is not None:
+            metrics.QUEUE_DEPTH.set(embedding["batching"]["queue_depth"], "embedding_batcher")
+            metrics.QUEUE_DEPTH.set(embedding["batching"]["inflight_batches"], "embedding_batches_in_flight")
+        if embedding["pool"] is not None:
+            metrics.QUEUE_DEPTH.set(embedding["pool"]["workers"] - embedding["pool"]["idle"], "embedding_pool_busy")
+
+    @timed("memory.store")
     async def store_memory(
         self,
         user_id: str,
@@ -48,102 +129,471 @@ class MemoryService:
             raise RuntimeError("Сервис не инициализирован")
         
         try:
-            logger.info(f"Сохраняю в память для пользователя {user_id}: {content[:100]}...")
-            embedding = self.embedding_service.encode_text_with_context(content, context)
+            hot_logger.info("Сохраняю в память для пользователя %s: %.100s...", user_id, content)
+            point_id = None
+            current_time = QdrantService.current_time()
+            if self.dedup:
+                point_id = QdrantService.content_point_id(user_id, content, context)
+                if await self.qdrant_service.existing_ids([point_id]):
+                    await self.qdrant_service.touch_points([point_id], time=current_time)
+                    self.hot_users.touch(user_id, [point_id], current_time)
+                    hot_logger.info("Память уже существует, обновлено время: %s", point_id)
+                    return {"id": point_id}
+
+            embedding = await self.embedding_service.embed_passage(content, context, cache_key=point_id)
             memory_id = await self.qdrant_service.store_vector(
                 user_id=user_id,
                 content=content,
                 vector=embedding,
-                context=context
+                context=context,
+                point_id=point_id,
+                time=current_time
+            )
+            self.hot_users.add(
+                user_id,
+                memory_id,
+                embedding,
+                QdrantService.build_payload(user_id, content, context, current_time)
             )
-            logger.info(f"Память сохранена с ID: {memory_id}")
+            hot_logger.info("Память сохранена с ID: %s", memory_id)
             return {"id": memory_id}
         except Exception as e:
             logger.error(f"Ошибка при сохранении памяти: {e}")
             raise
+        finally:
+            self.search_cache.bump(user_id)
     
+    @timed("memory.store_batch", batch_arg=1)
+    async def store_memories(
+        self,
+        items: List[MemoryCreate],
+        wait: bool = True,
+        chunk_size: Optional[int] = None
+    ) -> List[MemoryBatchItemResult]:
+        if not self.initialized:
+            raise RuntimeError("Сервис не инициализирован")
+
+        wait = wait or self.search_cache.enabled
+        try:
+            hot_logger.info("Пакетное сохранение %d воспоминаний", len(items))
+            ids: Dict[int, str] = {}
+            errors: Dict[int, str] = {}
+            pending = list(range(len(items)))
+            point_ids: Optional[List[str]] = None
+            current_time = QdrantService.current_time()
+
+            if self.dedup:
+                point_ids = [
+                    QdrantService.content_point_id(item.user_id, item.content, item.context)
+                    for item in items
+                ]
+                existing = await self.qdrant_service.existing_ids(list(set(point_ids)))
+                if existing:
+                    await self.qdrant_service.touch_points(list(existing), wait=wait, time=current_time)
+                    for i, point_id in enumerate(point_ids):
+                        if point_id in existing:
+                            self.hot_users.touch(items[i].user_id, [point_id], current_time)
+                first_index: Dict[str, int] = {}
+                for i, point_id in enumerate(point_ids):
+                    if point_id not in existing:
+                        first_index.setdefault(point_id, i)
+                pending = list(first_index.values())
+
+            embeddings, encode_errors = await self.embedding_service.embed_passages(
+                [(items[i].content, items[i].context) for i in pending],
+                cache_keys=[point_ids[i] for i in pending] if point_ids else None
+            )
+            for j, error in encode_errors.items():
+                errors[pending[j]] = error
+
+            indexes = [i for j, i in enumerate(pending) if j not in encode_errors]
+            vectors = [embeddings[j] for j in range(len(pending)) if j not in encode_errors]
+            stored = await self.qdrant_service.store_vectors(
+                [
+                    {
+                        "id": point_ids[i] if point_ids else None,
+                        "user_id": items[i].user_id,
+                        "content": items[i].content,
+                        "context": items[i].context,
+                        "vector": vector,
+                        "time": current_time
+                    }
+                    for i, vector in zip(indexes, vectors)
+                ],
+                chunk_size=chunk_size,
+                wait=wait
+            )
+            for i, vector, (memory_id, error) in zip(indexes, vectors, stored):
+                if error:
+                    errors[i] = error
+                else:
+                    ids[i] = memory_id
+                    self.hot_users.add(
+                        items[i].user_id,
+                        memory_id,
+                        vector,
+                        QdrantService.build_payload(items[i].user_id, items[i].content, items[i].context, current_time)
+                    )
+
+            if point_ids:
+                failed = {point_ids[i]: error for i, error in errors.items()}
+                for i, point_id in enumerate(point_ids):
+                    if point_id in failed:
+                        errors[i] = failed[point_id]
+                    else:
+                        ids[i] = point_id
+
+            results = []
+            for i in range(len(items)):
+                if i in errors:
+                    results.append(MemoryBatchItemResult(index=i, status="error", error=errors[i]))
+                else:
+                    results.append(MemoryBatchItemResult(index=i, status="success", memory_id=ids[i]))
+
+            hot_logger.info("Пакетно сохранено %d из %d воспоминаний", len(items) - len(errors), len(items))
+            return results
+        except Exception as e:
+            logger.error(f"Ошибка при пакетном сохранении памяти: {e}")
+            raise
+        finally:
+            for user_id in {item.user_id for item in items}:
+                self.search_cache.bump(user_id)
+
+    @staticmethod
+    def _parse_cursor(cursor: Optional[str]) -> Optional[Union[str, int]]:
+        if cursor is None or cursor == "":
+            return None
+        return int(cursor) if cursor.isdigit() else cursor
+
+    @timed("memory.list")
+    async def list_memories(
+        self,
+        user_id: str,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        include_vectors: bool = False
+    ) -> MemoryListResponse:
+        if not self.initialized:
+            raise RuntimeError("Сервис не инициализирован")
+
+        records, next_offset = await self.qdrant_service.scroll_page(
+            user_id=user_id,
+            limit=limit,
+            offset=self._parse_cursor(cursor),
+            with_vectors=include_vectors
+        )
+        return MemoryListResponse(
+            items=[MemoryRecord(**QdrantService.record_to_dict(record, include_vectors)) for record in records],
+            next_cursor=str(next_offset) if next_offset is not None else None
+        )
+
+    async def export_memories(
+        self,
+        user_id: str,
+        include_vectors: bool = False,
+        batch_size: int = 256
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        if not self.initialized:
+            raise RuntimeError("Сервис не инициализирован")
+
+        exported = 0
+        async for records in self.qdrant_service.iter_points(
+            user_id=user_id,
+            with_vectors=include_vectors,
+            batch_size=batch_size
+        ):
+            exported += len(records)
+            yield [QdrantService.record_to_dict(record, include_vectors) for record in records]
+        logger.info(f"Экспортировано {exported} воспоминаний пользователя {user_id}")
+
+    def _parse_import_line(self, line: bytes, user_id: Optional[str]) -> Dict[str, Any]:
+        data = json.loads(line)
+        if not isinstance(data, dict):
+            raise ValueError("ожидается JSON-объект")
+
+        source_user_id = data.get("user_id")
+        target_user_id = user_id or source_user_id
+        content = data.get("content")
+        if not isinstance(target_user_id, str) or not target_user_id:
+            raise ValueError("не указан user_id")
+        if not isinstance(content, str) or not content:
+            raise ValueError("не указан content")
+
+        context = data.get("context") or None
+        item = {
+            "user_id": target_user_id,
+            "content": content,
+            "context": context,
+            "time": data.get("time"),
+            "vector": None
+        }
+
+        if self.dedup:
+            item["id"] = QdrantService.content_point_id(target_user_id, content, context)
+        elif data.get("id") is not None and target_user_id == source_user_id:
+            item["id"] = str(data["id"])
+
+        vector = data.get("vector")
+        if vector is not None:
+            vector = np.asarray(vector, dtype=np.float32)
+            if vector.shape != (self.embedding_service.vector_size,):
+                raise ValueError(f"размер вектора {vector.shape} не совпадает с {self.embedding_service.vector_size}")
+            item["vector"] = vector
+        return item
+
+    @staticmethod
+    def _import_error(stats: Dict[str, Any], line: int, error: Any):
+        stats["failed"] += 1
+        if len(stats["errors"]) < 100:
+            stats["errors"].append(f"строка {line}: {error}")
+
+    async def _import_batch(self, batch: List[Dict[str, Any]], wait: bool, stats: Dict[str, Any]):
+        missing = [i for i, item in enumerate(batch) if item["vector"] is None]
+        failed = set()
+        if missing:
+            embeddings, errors = await self.embedding_service.embed_passages(
+                [(batch[i]["content"], batch[i]["context"]) for i in missing],
+                cache_keys=[batch[i]["id"] for i in missing] if self.dedup else None
+            )
+            for j, i in enumerate(missing):
+                if j in errors:
+                    failed.add(i)
+                    self._import_error(stats, batch[i]["line"], errors[j])
+                else:
+                    batch[i]["vector"] = embeddings[j]
+                    stats["encoded"] += 1
+
+        ready = [item for i, item in enumerate(batch) if i not in failed]
+        stored = await self.qdrant_service.store_vectors(ready, wait=wait)
+        for user_id in {item["user_id"] for item in ready}:
+            self.hot_users.invalidate(user_id)
+            self.search_cache.bump(user_id)
+        for item, (_, error) in zip(ready, stored):
+            if error:
+                self._import_error(stats, item["line"], error)
+            else:
+                stats["imported"] += 1
+
+    @timed("memory.import")
+    async def import_memories(
+        self,
+        chunks: AsyncIterator[bytes],
+        user_id: Optional[str] = None,
+        batch_size: int = 256,
+        wait: bool = True
+    ) -> MemoryImportResponse:
+        if not self.initialized:
+            raise RuntimeError("Сервис не инициализирован")
+
+        wait = wait or self.search_cache.enabled
+        stats: Dict[str, Any] = {"imported": 0, "encoded": 0, "failed": 0, "errors": []}
+        batch: List[Dict[str, Any]] = []
+        buffer = b""
+        line_number = 0
+
+        async def consume(line: bytes):
+            nonlocal batch
+            if not line.strip():
+                return
+            try:
+                item = self._parse_import_line(line, user_id)
+            except Exception as e:
+                self._import_error(stats, line_number, e)
+                return
+            item["line"] = line_number
+            batch.append(item)
+            if len(batch) >= batch_size:
+                await self._import_batch(batch, wait, stats)
+                batch = []
+
+        async for chunk in chunks:
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            if len(buffer) > self.import_max_line_bytes:
+                raise ValueError(f"Строка {line_number + len(lines) + 1} длиннее {self.import_max_line_bytes} байт")
+            for line in lines:
+                line_number += 1
+                await consume(line)
+        line_number += 1
+        await consume(buffer)
+        if batch:
+            await self._import_batch(batch, wait, stats)
+
+        logger.info(f"Импорт завершен: сохранено {stats['imported']}, закодировано {stats['encoded']}, ошибок {stats['failed']}")
+        return MemoryImportResponse(
+            status="success" if not stats["failed"] else ("partial" if stats["imported"] else "error"),
+            imported=stats["imported"],
+            encoded=stats["encoded"],
+            failed=stats["failed"],
+            errors=stats["errors"]
+        )
+
+    @timed("memory.search")
     async def search_memory(
         self,
         user_id: str,
         query: str,
         limit: int = 5, 
-        min_score: float = 0.3
-    ) -> List[MemoryResponse]:
+        min_score: float = 0.3,
+        as_rows: bool = False,
+        time_from: Optional[datetime] = None,
+        time_to: Optional[datetime] = None,
+        recency_half_life_days: Optional[float] = None,
+        recency_weight: float = 0.5
+    ) -> Union[List[MemoryResponse], List[Dict[str, Any]]]:
         if not self.initialized:
             raise RuntimeError("Сервис не инициализирован")
-        
+
+        key = (query, limit, min_score, as_rows, time_from, time_to, recency_half_life_days, recency_weight)
+        return await self.search_cache.get_or_compute(
+            user_id,
+            key,
+            lambda: self._search_memory(
+                user_id, query, limit, min_score, as_rows,
+                time_from, time_to, recency_half_life_days, recency_weight
+            )
+        )
+
+    async def _search_memory(
+        self,
+        user_id: str,
+        query: str,
+        limit: int,
+        min_score: float,
+        as_rows: bool,
+        time_from: Optional[datetime],
+        time_to: Optional[datetime],
+        recency_half_life_days: Optional[float],
+        recency_weight: float
+    ) -> Union[List[MemoryResponse], List[Dict[str, Any]]]:
         try:
-            logger.info(f"Поиск в памяти пользователя {user_id}: {query}")
-            query_embedding = self.embedding_service.encode_query(query)
+            hot_logger.info("Поиск в памяти пользователя %s: %.100s", user_id, query)
+            query_embedding = await self.embedding_service.embed_query(query)
             
-            search_results = await self.qdrant_service.search_similar(
-                user_id=user_id,
-                query_vector=query_embedding,
-                limit=limit,
-                min_score=min_score
-            )
+            search_results = None
+            if time_from is None and time_to is None and recency_half_life_days is None:
+                search_results = self.hot_users.search(user_id, query_embedding, limit, min_score)
+            if search_results is None:
+                search_results = await self.qdrant_service.search_similar(
+                    user_id=user_id,
+                    query_vector=query_embedding,
+                    limit=limit,
+                    min_score=min_score,
+                    time_from=QdrantService.to_timestamp(time_from),
+                    time_to=QdrantService.to_timestamp(time_to),
+                    recency_half_life_days=recency_half_life_days,
+                    recency_weight=recency_weight
+                )
             
-            memories = []
-            for result in search_results:
-                try:
-                    memory = MemoryResponse(
-                        user_id=result["user_id"],
-                        content=result["content"],
-                        score=result["score"],
-                        context=result.get("context"),
-                        time=result.get("time")
-                    )
-                    memories.append(memory)
-                except Exception as e:
-                    logger.error(f"Ошибка при обработке результата {result.get('id', 'unknown')}: {e}")
-                    continue
+            if as_rows:
+                memories = self._to_memory_rows(search_results)
+            else:
+                memories = self._to_memory_responses(search_results)
             
-            logger.info(f"Найдено {len(memories)} воспоминаний для пользователя {user_id}")
+            hot_logger.info("Найдено %d воспоминаний для пользователя %s", len(memories), user_id)
             return memories
         except Exception as e:
             logger.error(f"Ошибка при поиске в памяти: {e}")
             raise
 
-class FaceService:
-    def __init__(self):
-        self.faces = {}
-        self.counter = 0
-
-    async def add_face(self, user_id: str, name: str, image: str):
-        self.counter += 1
-        face_id = str(self.counter)
-        if user_id not in self.faces:
-            self.faces[user_id] = []
-        self.faces[user_id].append({
-            "id": face_id,
-            "name": name,
-            "image": image
-        })
-        return face_id
+    @timed("memory.search_batch", batch_arg=1)
+    async def search_memories(
+        self,
+        queries: List[MemorySearch],
+        as_rows: bool = False
+    ) -> Union[List[MemorySearchGroup], List[Dict[str, Any]]]:
+        if not self.initialized:
+            raise RuntimeError("Сервис не инициализирован")
+
+        try:
+            hot_logger.info("Пакетный поиск в памяти: %d запросов", len(queries))
+            query_embeddings = await self.embedding_service.embed_queries([q.query for q in queries])
+
+            batch_results = [
+                self.hot_users.search(q.user_id, vector, q.limit, q.min_score)
+                if q.time_from is None and q.time_to is None and q.recency_half_life_days is None else None
+                for q, vector in zip(queries, query_embeddings)
+            ]
+            remote = [i for i, results in enumerate(batch_results) if results is None]
+            if remote:
+                remote_results = await self.qdrant_service.search_similar_batch([
+                    {
+                        "user_id": queries[i].user_id,
+                        "vector": query_embeddings[i],
+                        "limit": queries[i].limit,
+                        "min_score": queries[i].min_score,
+                        "time_from": QdrantService.to_timestamp(queries[i].time_from),
+                        "time_to": QdrantService.to_timestamp(queries[i].time_to),
+                        "recency_half_life_days": queries[i].recency_half_life_days,
+                        "recency_weight": queries[i].recency_weight
+                    }
+                    for i in remote
+                ])
+                for i, results in zip(remote, remote_results):
+                    batch_results[i] = results
+
+            if as_rows:
+                return [
+                    {
+                        "index": i,
+                        "user_id": q.user_id,
+                        "query": q.query,
+                        "memories": self._to_memory_rows(results)
+                    }
+                    for i, (q, results) in enumerate(zip(queries, batch_results))
+                ]
+            return [
+                MemorySearchGroup(
+                    index=i,
+                    user_id=q.user_id,
+                    query=q.query,
+                    memories=self._to_memory_responses(results)
+                )
+                for i, (q, results) in enumerate(zip(queries, batch_results))
+            ]
+        except Exception as e:
+            logger.error(f"Ошибка при пакетном поиске в памяти: {e}")
+            raise
+
+    @staticmethod
+    @timed("memory.serialize")
+    def _to_memory_responses(search_results: List[Dict[str, Any]]) -> List[MemoryResponse]:
+        memories = []
+        for result in search_results:
+            try:
+                memory = MemoryResponse(
+                    user_id=result["user_id"],
+                    content=result["content"],
+                    score=result["score"],
+                    context=result.get("context"),
+                    time=result.get("time")
+                )
+                memories.append(memory)
+            except Exception as e:
+                logger.error(f"Ошибка при обработке результата {result.get('id', 'unknown')}: {e}")
+                continue
+        return memories
 
     @staticmethod
-    def cosine_similarity(a: str, b: str) -> float:
-        a_words = Counter(a.lower().split())
-        b_words = Counter(b.lower().split())
-        all_words = set(a_words) | set(b_words)
-        v1 = [a_words.get(w, 0) for w in all_words]
-        v2 = [b_words.get(w, 0) for w in all_words]
-        dot = sum(x*y for x, y in zip(v1, v2))
-        norm1 = math.sqrt(sum(x*x for x in v1))
-        norm2 = math.sqrt(sum(x*x for x in v2))
-        if norm1 == 0 or norm2 == 0:
-            return 0.0
-        return dot / (norm1 * norm2)
-
-    async def find_face(self, user_id: str, query: str, min_score: float = 0.7):
-        faces = self.faces.get(user_id, [])
-        best = None
-        best_score = 0.0
-        for face in faces:
-            score = self.cosine_similarity(face["name"], query)
-            if score > best_score:
-                best_score = score
-                best = face
-        if best and best_score >= min_score:
-            return {"image": best["image"], "score": best_score}
-        return None
+    @timed("memory.serialize")
+    def _to_memory_rows(search_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        rows = []
+        for result in search_results:
+            user_id = result.get("user_id")
+            content = result.get("content")
+            context = result.get("context")
+            time_value = result.get("time")
+            if not (
+                isinstance(user_id, str) and isinstance(content, str) and isinstance(time_value, str)
+                and (context is None or isinstance(context, str))
+            ):
+                logger.error(f"Ошибка при обработке результата {result.get('id', 'unknown')}: некорректный payload")
+                continue
+            rows.append({
+                "user_id": user_id,
+                "content": content,
+                "score": np.float32(result["score"]),
+                "time": time_value,
+                "context": context
+            })
+        return rows
@@ -0,0 +1,266 @@
+import asyncio
+import functools
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _labels(self, values: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def set(self, value: float, *labels: str):
+        with self._lock:
+            self._values[labels] = value
+
+    def value(self, *labels: str) -> float:
+        with self._lock:
+            return self._values.get(labels, 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{self._labels(labels)} {_format_value(value)}" for labels, value in self._values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for labels, series in self._series.items():
+                cumulative = 0.0
+                for bound, count in zip((*self.buckets, math.inf), series):
+                    cumulative += count
+                    le = 'le="' + _format_value(bound) + '"'
+                    lines.append(f"{self.name}_bucket{self._labels(labels, le)} {_format_value(cumulative)}")
+                lines.append(f"{self.name}_sum{self._labels(labels)} {_format_value(series[-1])}")
+                lines.append(f"{self.name}_count{self._labels(labels)} {_format_value(cumulative)}")
+        return lines
+
+
+class Registry:
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], None]] = []
+        self.configure()
+
+    def configure(self):
+        self.enabled = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "ltm_stage_duration_seconds",
+    "Время выполнения этапов обработки",
+    ("stage",)
+))
+BATCH_SIZE = REGISTRY.register(Histogram(
+    "ltm_batch_size",
+    "Размеры пакетов по этапам",
+    ("stage",),
+    buckets=SIZE_BUCKETS
+))
+STAGE_ERRORS = REGISTRY.register(Counter(
+    "ltm_stage_errors_total",
+    "Ошибки по этапам обработки",
+    ("stage",)
+))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "ltm_http_request_duration_seconds",
+    "Время обработки HTTP-запросов",
+    ("method", "route", "status")
+))
+INFLIGHT_REQUESTS = REGISTRY.register(Gauge(
+    "ltm_http_requests_in_flight",
+    "HTTP-запросы в обработке"
+))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "ltm_cache_requests_total",
+    "Обращения к кэшам по результату",
+    ("cache", "result")
+))
+CACHE_HIT_RATIO = REGISTRY.register(Gauge(
+    "ltm_cache_hit_ratio",
+    "Доля попаданий в кэш",
+    ("cache",)
+))
+QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "ltm_queue_depth",
+    "Глубина очередей и число пакетов в работе",
+    ("queue",)
+))
+CONSOLIDATION_REMOVED = REGISTRY.register(Counter(
+    "ltm_consolidation_removed_points_total",
+    "Точки, удаленные фоновой консолидацией, по причине",
+    ("reason",)
+))
+CONSOLIDATION_RECLAIMED_BYTES = REGISTRY.register(Counter(
+    "ltm_consolidation_reclaimed_bytes_total",
+    "Оценка освобожденного консолидацией объема"
+))
+
+
+def observe(stage: str, seconds: float):
+    if REGISTRY.enabled:
+        STAGE_SECONDS.observe(seconds, stage)
+
+
+def observe_batch(stage: str, size: int):
+    if REGISTRY.enabled:
+        BATCH_SIZE.observe(size, stage)
+
+
+def timed(stage: str, batch_arg: Optional[int] = None):
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if not REGISTRY.enabled:
+                    return await fn(*args, **kwargs)
+                if batch_arg is not None and len(args) > batch_arg:
+                    BATCH_SIZE.observe(len(args[batch_arg]), stage)
+                started = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                except Exception:
+                    STAGE_ERRORS.inc(stage)
+                    raise
+                finally:
+                    STAGE_SECONDS.observe(time.perf_counter() - started, stage)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not REGISTRY.enabled:
+                return fn(*args, **kwargs)
+            if batch_arg is not None and len(args) > batch_arg:
+                BATCH_SIZE.observe(len(args[batch_arg]), stage)
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                STAGE_ERRORS.inc(stage)
+                raise
+            finally:
+                STAGE_SECONDS.observe(time.perf_counter() - started, stage)
+        return wrapper
+    return decorator
+
+
+class MetricsMiddleware:
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not REGISTRY.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        INFLIGHT_REQUESTS.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            INFLIGHT_REQUESTS.dec()
+            endpoint = getattr(scope.get("endpoint"), "__name__", "unmatched")
+            REQUEST_SECONDS.observe(time.perf_counter() - started, scope["method"], endpoint, str(status))
@@ -0,0 +1,83 @@
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+class Projection:
+
+    def __init__(
+        self,
+        mean: np.ndarray,
+        components: np.ndarray,
+        explained_variance: float = 0.0,
+        sample_size: int = 0,
+        fitted_at: Optional[str] = None,
+        applied: bool = False,
+        version: Optional[str] = None
+    ):
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.components = np.asarray(components, dtype=np.float32)
+        self.explained_variance = float(explained_variance)
+        self.sample_size = int(sample_size)
+        self.fitted_at = fitted_at
+        self.applied = applied
+        self.version = version
+
+    @property
+    def dim(self) -> int:
+        return self.components.shape[0]
+
+    @property
+    def source_dim(self) -> int:
+        return self.components.shape[1]
+
+    @classmethod
+    def fit(cls, vectors: np.ndarray, dim: int, fitted_at: Optional[str] = None) -> "Projection":
+        vectors = normalize(vectors).astype(np.float64)
+        if vectors.ndim != 2 or len(vectors) < 2:
+            raise ValueError("Для PCA нужно хотя бы два вектора")
+        if not 0 < dim < vectors.shape[1]:
+            raise ValueError(f"Размерность проекции {dim} должна быть меньше {vectors.shape[1]}")
+
+        mean = vectors.mean(axis=0)
+        centered = vectors - mean
+        covariance = centered.T @ centered / (len(vectors) - 1)
+        eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+        order = np.argsort(eigenvalues)[::-1][:dim]
+        total = float(eigenvalues.clip(min=0).sum())
+        explained = float(eigenvalues[order].clip(min=0).sum() / total) if total > 0 else 0.0
+        return cls(mean, eigenvectors[:, order].T, explained, len(vectors), fitted_at)
+
+    def project(self, vectors: np.ndarray) -> np.ndarray:
+        return (normalize(vectors) - self.mean) @ self.components.T
+
+    def to_payload(self) -> Dict[str, Any]:
+        return {
+            "dim": self.dim,
+            "source_dim": self.source_dim,
+            "mean": self.mean.tolist(),
+            "components": self.components.tolist(),
+            "explained_variance": self.explained_variance,
+            "sample_size": self.sample_size,
+            "fitted_at": self.fitted_at,
+            "applied": self.applied,
+            "version": self.version
+        }
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> "Projection":
+        return cls(
+            mean=payload["mean"],
+            components=payload["components"],
+            explained_variance=payload.get("explained_variance", 0.0),
+            sample_size=payload.get("sample_size", 0),
+            fitted_at=payload.get("fitted_at"),
+            applied=payload.get("applied", True),
+            version=payload.get("version")
+        )
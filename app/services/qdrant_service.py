@@ -1,31 +1,147 @@
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
 from qdrant_client.http.models import (
     Distance, VectorParams, PointStruct, 
     Filter, 
-    FieldCondition, MatchValue
+    FieldCondition, MatchValue, Range,
+    SearchRequest, ScoredPoint,
+    QueryRequest, Prefetch, FormulaQuery, MultExpression, SumExpression,
+    ExpDecayExpression, DecayParamsExpression,
+    IsEmptyCondition, HasVectorCondition, PayloadField, SetPayload, SetPayloadOperation, IntegerIndexParams, PointVectors,
+    PointIdsList, Record,
+    HnswConfigDiff, KeywordIndexParams, PayloadSchemaType,
+    ScalarQuantization, ScalarQuantizationConfig, ScalarType,
+    BinaryQuantization, BinaryQuantizationConfig, Disabled,
+    SearchParams, QuantizationSearchParams, VectorParamsDiff
 )
+import asyncio
+import hashlib
+import itertools
 import uuid
 import os
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple, Union
 import numpy as np
 import logging
+import time
 from datetime import datetime, timezone
 
+from . import metrics
+from .projection import Projection
+
 logger = logging.getLogger(__name__)
+hot_logger = logging.getLogger(f"{__name__}.hot")
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+FULL_VECTOR = "full"
+COMPACT_VECTOR = "compact"
 
 class QdrantService:
     def __init__(self):
         self.host = os.getenv("QDRANT_HOST", "localhost")
+        self.location = os.getenv("QDRANT_LOCATION") or None
         self.port = int(os.getenv("QDRANT_PORT", 6333))
         self.collection_name = os.getenv("QDRANT_COLLECTION", "ltm_memories")
+        self.grpc_port = int(os.getenv("QDRANT_GRPC_PORT", 6334))
+        self.prefer_grpc = os.getenv("QDRANT_PREFER_GRPC", "false").lower() == "true"
+        self.pool_size = max(1, int(os.getenv("QDRANT_POOL_SIZE", 1)))
+        self.timeout = int(os.getenv("QDRANT_TIMEOUT", 10))
+        self.retries = int(os.getenv("QDRANT_RETRIES", 2))
+        self.retry_backoff = float(os.getenv("QDRANT_RETRY_BACKOFF", 0.1))
+        self.upsert_chunk_size = int(os.getenv("QDRANT_UPSERT_CHUNK_SIZE", 256))
+        self.tenant_index = os.getenv("QDRANT_TENANT_INDEX", "true").lower() == "true"
+        self.hnsw_m = int(os.getenv("QDRANT_HNSW_M")) if os.getenv("QDRANT_HNSW_M") else None
+        self.hnsw_payload_m = int(os.getenv("QDRANT_HNSW_PAYLOAD_M", 16))
+        self.quantization = os.getenv("QDRANT_QUANTIZATION", "none").lower()
+        if self.quantization not in ("none", "scalar", "binary"):
+            raise ValueError(f"Неизвестный режим квантования: {self.quantization}")
+        self.vectors_on_disk = os.getenv("QDRANT_VECTORS_ON_DISK", "false").lower() == "true"
+        self.quantization_always_ram = os.getenv("QDRANT_QUANTIZATION_ALWAYS_RAM", "true").lower() == "true"
+        self.search_rescore = os.getenv("QDRANT_SEARCH_RESCORE", "true").lower() == "true"
+        self.search_oversampling = float(os.getenv("QDRANT_SEARCH_OVERSAMPLING", 2.0))
+        self.recency_prefetch_factor = int(os.getenv("QDRANT_RECENCY_PREFETCH_FACTOR", 10))
+        self.recency_prefetch_max = int(os.getenv("QDRANT_RECENCY_PREFETCH_MAX", 500))
+        self.compact_dim = int(os.getenv("QDRANT_COMPACT_DIM", 0))
+        self.compact_full_index = os.getenv("QDRANT_COMPACT_FULL_INDEX", "true").lower() == "true"
+        self.compact_candidates_factor = int(os.getenv("QDRANT_COMPACT_CANDIDATES_FACTOR", 4))
+        self.compact_candidates_max = int(os.getenv("QDRANT_COMPACT_CANDIDATES_MAX", 1000))
+        self.projection_refresh = float(os.getenv("QDRANT_PROJECTION_REFRESH", 30))
+        self.vector_name: Optional[str] = None
+        self.compact_size: Optional[int] = None
+        self.full_size: Optional[int] = None
+        self.projection: Optional[Projection] = None
+        self.compact_search = False
+        self._projection_checked_at = 0.0
         self.client = None
+        self.clients: List[AsyncQdrantClient] = []
+        self._client_cycle = None
+
+    async def connect(self):
+        if self.client is None and self.location is not None:
+            logger.info(f"Qdrant в локальном режиме: {self.location}")
+            if self.location == ":memory:":
+                self.clients = [AsyncQdrantClient(location=self.location)]
+            else:
+                self.clients = [AsyncQdrantClient(path=self.location)]
+            self.client = self.clients[0]
+            self._client_cycle = itertools.cycle(self.clients)
+        elif self.client is None:
+            transport = f"gRPC :{self.grpc_port}" if self.prefer_grpc else f"REST :{self.port}"
+            logger.info(f"Подключаюсь к Qdrant: {self.host} ({transport}, пул {self.pool_size})")
+            self.clients = [
+                AsyncQdrantClient(
+                    host=self.host,
+                    port=self.port,
+                    grpc_port=self.grpc_port,
+                    prefer_grpc=self.prefer_grpc,
+                    timeout=self.timeout
+                )
+                for _ in range(self.pool_size)
+            ]
+            self.client = self.clients[0]
+            self._client_cycle = itertools.cycle(self.clients)
+
+    @staticmethod
+    def _is_transient(error: Exception) -> bool:
+        if isinstance(error, (ResponseHandlingException, ConnectionError, asyncio.TimeoutError)):
+            return True
+        if isinstance(error, UnexpectedResponse):
+            return error.status_code is not None and error.status_code >= 500
+        try:
+            import grpc
+        except ImportError:
+            return False
+        if isinstance(error, grpc.RpcError):
+            return error.code() in (
+                grpc.StatusCode.UNAVAILABLE,
+                grpc.StatusCode.DEADLINE_EXCEEDED,
+                grpc.StatusCode.RESOURCE_EXHAUSTED
+            )
+        return False
+
+    async def _call(self, method: str, **kwargs):
+        attempt = 0
+        started = time.perf_counter()
+        while True:
+            client = next(self._client_cycle)
+            try:
+                result = await getattr(client, method)(**kwargs)
+                metrics.observe(f"qdrant.{method}", time.perf_counter() - started)
+                return result
+            except Exception as e:
+                if attempt >= self.retries or not self._is_transient(e):
+                    if metrics.REGISTRY.enabled:
+                        metrics.STAGE_ERRORS.inc(f"qdrant.{method}")
+                    raise
+                delay = self.retry_backoff * (2 ** attempt)
+                attempt += 1
+                logger.warning(f"Qdrant {method}: временная ошибка ({e}), повтор {attempt}/{self.retries} через {delay:.2f} с")
+                await asyncio.sleep(delay)
         
     async def initialize(self, vector_size: int):
         try:
-            logger.info(f"Подключаюсь к Qdrant: {self.host}:{self.port}")
-            self.client = QdrantClient(host=self.host, port=self.port)
+            await self.connect()
             
-            collections = self.client.get_collections()
+            collections = await self.client.get_collections()
             collection_exists = any(
                 collection.name == self.collection_name 
                 for collection in collections.collections
@@ -33,102 +149,920 @@ class QdrantService:
             
             if not collection_exists:
                 logger.info(f"Создаю коллекцию: {self.collection_name}")
-                self.client.create_collection(
+                await self.client.create_collection(
                     collection_name=self.collection_name,
-                    vectors_config=VectorParams(
-                        size=vector_size,
-                        distance=Distance.COSINE
-                    )
+                    vectors_config=self._vectors_config(vector_size),
+                    hnsw_config=self._hnsw_config() if self.tenant_index else None,
+                    quantization_config=self._quantization_config()
                 )
                 logger.info("Коллекция создана успешно")
             else:
                 logger.info(f"Коллекция {self.collection_name} уже существует")
+                await self._check_storage_config()
+            await self.load_layout()
+
+            if self.tenant_index and self.location is None:
+                await self._ensure_tenant_index()
+            if self.location is None:
+                await self._ensure_timestamp_index()
         except Exception as e:
             logger.error(f"Ошибка при инициализации Qdrant: {e}")
             raise
+
+    def _vectors_config(self, vector_size: int) -> Union[VectorParams, Dict[str, VectorParams]]:
+        full = VectorParams(
+            size=vector_size,
+            distance=Distance.COSINE,
+            on_disk=self.vectors_on_disk
+        )
+        if self.compact_dim <= 0:
+            return full
+        if not self.compact_full_index:
+            full.hnsw_config = HnswConfigDiff(m=0)
+        return {
+            FULL_VECTOR: full,
+            COMPACT_VECTOR: VectorParams(size=self.compact_dim, distance=Distance.COSINE)
+        }
+
+    @staticmethod
+    def _full_params(info) -> VectorParams:
+        vectors = info.config.params.vectors
+        return vectors[FULL_VECTOR] if isinstance(vectors, dict) else vectors
+
+    async def load_layout(self):
+        info = await self.client.get_collection(self.collection_name)
+        vectors = info.config.params.vectors
+        self.vector_name = FULL_VECTOR if isinstance(vectors, dict) else None
+        self.compact_size = vectors[COMPACT_VECTOR].size if isinstance(vectors, dict) and COMPACT_VECTOR in vectors else None
+        self.full_size = self._full_params(info).size
+        self.projection = None
+        self.compact_search = False
+        self._projection_checked_at = time.monotonic()
+
+        if self.compact_size is None:
+            if self.compact_dim > 0:
+                logger.warning(
+                    f"QDRANT_COMPACT_DIM={self.compact_dim}, но коллекция {self.collection_name} создана без "
+                    f"компактного вектора. Создайте новую коллекцию и перенесите данные: "
+                    f"python -m app.maintenance copy-collection --source {self.collection_name}"
+                )
+            return
+
+        projection = await self.load_projection()
+        if projection is None:
+            logger.warning(
+                "Проекция для компактных векторов не обучена, поиск идет по полным векторам. "
+                "Запустите: python -m app.maintenance fit-projection && python -m app.maintenance apply-projection"
+            )
+        elif self._accept_projection(projection):
+            await self._update_compact_search()
+            logger.info(
+                f"Проекция {projection.source_dim}->{projection.dim}, "
+                f"объясненная дисперсия {projection.explained_variance:.3f}, обучена {projection.fitted_at}, "
+                f"поиск {'по компактным векторам' if self.compact_search else 'по полным векторам'}"
+            )
+
+    def _accept_projection(self, projection: Projection) -> bool:
+        if projection.dim != self.compact_size or projection.source_dim != self.full_size:
+            logger.error(
+                f"Проекция {projection.source_dim}->{projection.dim} не подходит к коллекции "
+                f"{self.full_size}->{self.compact_size}, компактный поиск отключен"
+            )
+            self.projection = None
+            self.compact_search = False
+            return False
+        self.projection = projection
+        return True
+
+    async def count_missing_compact(self) -> int:
+        result = await self._call(
+            "count",
+            collection_name=self.collection_name,
+            count_filter=self._missing_compact_filter(),
+            exact=True
+        )
+        return result.count
+
+    async def _update_compact_search(self):
+        self.compact_search = False
+        if not self.projection.applied:
+            logger.warning(
+                "Компактные векторы еще не пересчитаны под текущую проекцию, поиск идет по полным векторам. "
+                "Запустите: python -m app.maintenance apply-projection"
+            )
+            return
+        missing = await self.count_missing_compact()
+        if missing:
+            logger.warning(
+                f"У {missing} точек нет компактного вектора, поиск идет по полным векторам. "
+                f"Запустите: python -m app.maintenance apply-projection"
+            )
+            return
+        self.compact_search = True
+
+    async def refresh_projection(self):
+        if self.compact_size is None or self.projection_refresh <= 0:
+            return
+        if time.monotonic() - self._projection_checked_at < self.projection_refresh:
+            return
+        self._projection_checked_at = time.monotonic()
+
+        try:
+            if not await self.client.collection_exists(self.projection_collection):
+                return
+            records = await self._call(
+                "retrieve",
+                collection_name=self.projection_collection,
+                ids=[1],
+                with_payload=["version", "applied"],
+                with_vectors=False
+            )
+            if not records:
+                return
+            state = records[0].payload or {}
+            if self.projection is None or state.get("version") != self.projection.version:
+                projection = await self.load_projection()
+                if projection is None or not self._accept_projection(projection):
+                    return
+                logger.info(f"Загружена новая проекция {projection.source_dim}->{projection.dim}, обучена {projection.fitted_at}")
+                await self._update_compact_search()
+            elif not self.compact_search and state.get("applied", True):
+                self.projection.applied = True
+                await self._update_compact_search()
+                if self.compact_search:
+                    logger.info("Компактные векторы пересчитаны, поиск переключен на компактные векторы")
+        except Exception as e:
+            logger.warning(f"Не удалось обновить проекцию компактных векторов: {e}")
+
+    @property
+    def compact_active(self) -> bool:
+        return self.projection is not None and self.compact_size is not None
+
+    @property
+    def projection_collection(self) -> str:
+        return f"{self.collection_name}_projection"
+
+    async def load_projection(self) -> Optional[Projection]:
+        if not await self.client.collection_exists(self.projection_collection):
+            return None
+        records = await self._call(
+            "retrieve",
+            collection_name=self.projection_collection,
+            ids=[1],
+            with_payload=True,
+            with_vectors=False
+        )
+        return Projection.from_payload(records[0].payload) if records else None
+
+    async def save_projection(self, projection: Projection):
+        if self.client is None:
+            raise RuntimeError("Клиент Qdrant не инициализирован")
+
+        if not await self.client.collection_exists(self.projection_collection):
+            await self.client.create_collection(
+                collection_name=self.projection_collection,
+                vectors_config=VectorParams(size=1, distance=Distance.DOT)
+            )
+        projection.version = uuid.uuid4().hex
+        projection.applied = False
+        await self._call(
+            "upsert",
+            collection_name=self.projection_collection,
+            points=[PointStruct(id=1, vector=[0.0], payload=projection.to_payload())],
+            wait=True
+        )
+        if self.compact_size == projection.dim:
+            self.projection = projection
+            self.compact_search = False
+        logger.info(f"Проекция {projection.source_dim}->{projection.dim} сохранена в {self.projection_collection}")
+
+    async def apply_projection(self, batch_size: int = 256) -> Dict[str, int]:
+        if not self.compact_active:
+            raise RuntimeError("Компактный вектор недоступен: нет слота compact в коллекции или проекция не обучена")
+
+        settle = self.projection_refresh - (time.time() - (self.to_timestamp(self.projection.fitted_at) or 0))
+        if settle > 0:
+            logger.info(f"Жду {settle:.0f} с, пока запущенные сервисы подхватят проекцию (QDRANT_PROJECTION_REFRESH)")
+            await asyncio.sleep(settle)
+
+        updated = 0
+        async for records in self.iter_points(with_vectors=True, batch_size=batch_size, with_payload=False):
+            await self._update_compact(records)
+            updated += len(records)
+
+        filled = 0
+        while True:
+            records, _ = await self._call(
+                "scroll",
+                collection_name=self.collection_name,
+                scroll_filter=self._missing_compact_filter(),
+                limit=batch_size,
+                with_payload=False,
+                with_vectors=self._with_vectors(True)
+            )
+            if not records:
+                break
+            await self._update_compact(self._unpack_vectors(records))
+            filled += len(records)
+
+        await self._call(
+            "set_payload",
+            collection_name=self.projection_collection,
+            payload={"applied": True},
+            points=[1],
+            wait=True
+        )
+        self.projection.applied = True
+        self.compact_search = True
+        logger.info(f"Компактные векторы пересчитаны для {updated} точек, дозаполнено {filled}")
+        return {"updated": updated, "filled": filled}
+
+    async def _update_compact(self, records: List[Record]):
+        compact = self.projection.project(np.asarray([record.vector for record in records], dtype=np.float32))
+        await self._call(
+            "update_vectors",
+            collection_name=self.collection_name,
+            points=[
+                PointVectors(id=record.id, vector={COMPACT_VECTOR: vector.tolist()})
+                for record, vector in zip(records, compact)
+            ],
+            wait=True
+        )
+
+    def _point_vector(self, vector) -> Union[List[float], Dict[str, List[float]]]:
+        values = np.asarray(vector, dtype=np.float32)
+        if self.vector_name is None:
+            return values.tolist()
+        result = {FULL_VECTOR: values.tolist()}
+        if self.compact_active:
+            result[COMPACT_VECTOR] = self.projection.project(values).tolist()
+        return result
+
+    def _with_vectors(self, with_vectors: bool) -> Union[bool, List[str]]:
+        return [FULL_VECTOR] if with_vectors and self.vector_name else with_vectors
+
+    def _unpack_vectors(self, records: List[Record]) -> List[Record]:
+        if self.vector_name is not None:
+            for record in records:
+                if isinstance(record.vector, dict):
+                    record.vector = record.vector.get(FULL_VECTOR)
+        return records
+
+    def _quantization_config(self):
+        if self.quantization == "scalar":
+            return ScalarQuantization(
+                scalar=ScalarQuantizationConfig(
+                    type=ScalarType.INT8,
+                    quantile=0.99,
+                    always_ram=self.quantization_always_ram
+                )
+            )
+        if self.quantization == "binary":
+            return BinaryQuantization(
+                binary=BinaryQuantizationConfig(always_ram=self.quantization_always_ram)
+            )
+        return None
+
+    def _search_params(self) -> Optional[SearchParams]:
+        if self.quantization == "none":
+            return None
+        return SearchParams(
+            quantization=QuantizationSearchParams(
+                rescore=self.search_rescore,
+                oversampling=self.search_oversampling
+            )
+        )
+
+    @staticmethod
+    def _quantization_mode(config) -> str:
+        if config is None:
+            return "none"
+        if isinstance(config, ScalarQuantization):
+            return "scalar"
+        if isinstance(config, BinaryQuantization):
+            return "binary"
+        return type(config).__name__
+
+    async def _check_storage_config(self):
+        info = await self.client.get_collection(self.collection_name)
+        current_mode = self._quantization_mode(info.config.quantization_config)
+        current_on_disk = bool(self._full_params(info).on_disk)
+        if current_mode != self.quantization or current_on_disk != self.vectors_on_disk:
+            logger.warning(
+                f"Конфигурация хранения коллекции ({current_mode}, on_disk={current_on_disk}) "
+                f"отличается от настроек ({self.quantization}, on_disk={self.vectors_on_disk}). "
+                f"Запустите: python -m app.maintenance migrate-storage"
+            )
+
+    async def migrate_storage(self, snapshot: bool = True, dry_run: bool = False) -> Dict[str, Any]:
+        if self.client is None:
+            raise RuntimeError("Клиент Qdrant не инициализирован")
+
+        info = await self.client.get_collection(self.collection_name)
+        current = {
+            "quantization": self._quantization_mode(info.config.quantization_config),
+            "on_disk": bool(self._full_params(info).on_disk)
+        }
+        target = {"quantization": self.quantization, "on_disk": self.vectors_on_disk}
+        result = {"current": current, "target": target, "changed": current != target, "snapshot": None}
+        if dry_run or current == target:
+            return result
+
+        if snapshot:
+            description = await self.client.create_snapshot(collection_name=self.collection_name, wait=True)
+            result["snapshot"] = description.name if description else None
+            logger.info(f"Снимок коллекции перед миграцией: {result['snapshot']}")
+
+        logger.info(f"Миграция хранения: {current} -> {target}")
+        await self.client.update_collection(
+            collection_name=self.collection_name,
+            vectors_config={self.vector_name or "": VectorParamsDiff(on_disk=self.vectors_on_disk)},
+            quantization_config=self._quantization_config() or Disabled.DISABLED
+        )
+        return result
+
+    def _hnsw_config(self) -> HnswConfigDiff:
+        return HnswConfigDiff(m=self.hnsw_m, payload_m=self.hnsw_payload_m)
+
+    async def _ensure_tenant_index(self):
+        info = await self.client.get_collection(self.collection_name)
+
+        index = (info.payload_schema or {}).get("user_id")
+        if index is None or not getattr(index.params, "is_tenant", False):
+            if index is None:
+                logger.info("Создаю tenant-индекс по полю user_id")
+            else:
+                logger.warning("Payload-индекс по полю user_id создан без is_tenant, пересоздаю его как tenant-индекс")
+            await self.client.create_payload_index(
+                collection_name=self.collection_name,
+                field_name="user_id",
+                field_schema=KeywordIndexParams(type="keyword", is_tenant=True),
+                wait=True
+            )
+
+        hnsw = info.config.hnsw_config
+        if hnsw.payload_m != self.hnsw_payload_m or (self.hnsw_m is not None and hnsw.m != self.hnsw_m):
+            logger.info(f"Обновляю HNSW: m={self.hnsw_m or hnsw.m}, payload_m={self.hnsw_payload_m}")
+            await self.client.update_collection(
+                collection_name=self.collection_name,
+                hnsw_config=self._hnsw_config()
+            )
+
+        info = await self.client.get_collection(self.collection_name)
+        index = (info.payload_schema or {}).get("user_id")
+        if index is None or index.data_type != PayloadSchemaType.KEYWORD:
+            raise RuntimeError("Payload-индекс по полю user_id не создан")
+        if not getattr(index.params, "is_tenant", False):
+            logger.warning("Qdrant не сохранил is_tenant у индекса user_id (нужна версия 1.11+), данные не группируются по пользователям")
+        else:
+            logger.info("Tenant-индекс по полю user_id на месте")
+
+    async def _ensure_timestamp_index(self):
+        info = await self.client.get_collection(self.collection_name)
+        if "timestamp" in (info.payload_schema or {}):
+            return
+
+        logger.info("Создаю payload-индекс по полю timestamp")
+        await self.client.create_payload_index(
+            collection_name=self.collection_name,
+            field_name="timestamp",
+            field_schema=IntegerIndexParams(type="integer", lookup=False, range=True),
+            wait=True
+        )
+        missing = await self.client.count(
+            collection_name=self.collection_name,
+            count_filter=self._missing_timestamp_filter(),
+            exact=False
+        )
+        if missing.count:
+            logger.warning(
+                f"Примерно у {missing.count} точек нет поля timestamp, фильтр по времени их не увидит. "
+                f"Запустите: python -m app.maintenance backfill-timestamps"
+            )
+
+    async def close(self):
+        if self.client is not None:
+            for client in self.clients:
+                await client.close()
+            self.clients = []
+            self.client = None
+            self._client_cycle = None
     
+    @staticmethod
+    def content_point_id(user_id: str, content: str, context: Optional[str] = None) -> str:
+        digest = hashlib.sha256(
+            "\x00".join((user_id, content, context or "")).encode("utf-8")
+        ).hexdigest()
+        return str(uuid.UUID(hex=digest[:32]))
+
+    @staticmethod
+    def current_time() -> str:
+        return datetime.now(timezone.utc).strftime(TIME_FORMAT)
+
+    @staticmethod
+    def to_timestamp(value: Union[str, datetime, None]) -> Optional[int]:
+        if isinstance(value, str):
+            try:
+                value = datetime.strptime(value, TIME_FORMAT)
+            except ValueError:
+                try:
+                    value = datetime.fromisoformat(value)
+                except ValueError:
+                    return None
+        if not isinstance(value, datetime):
+            return None
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp())
+
+    @classmethod
+    def build_payload(
+        cls,
+        user_id: str,
+        content: str,
+        context: Optional[str] = None,
+        time: Optional[str] = None
+    ) -> Dict[str, Any]:
+        payload = {
+            "user_id": user_id,
+            "content": content,
+            "time": time or cls.current_time()
+        }
+        timestamp = cls.to_timestamp(payload["time"])
+        if timestamp is not None:
+            payload["timestamp"] = timestamp
+
+        if context:
+            payload["context"] = context
+        return payload
+
+    def _build_point(
+        self,
+        user_id: str,
+        content: str,
+        vector: np.ndarray,
+        context: Optional[str] = None,
+        point_id: Optional[str] = None,
+        time: Optional[str] = None
+    ) -> PointStruct:
+        return PointStruct(
+            id=point_id or str(uuid.uuid4()),
+            vector=self._point_vector(vector),
+            payload=self.build_payload(user_id, content, context, time)
+        )
+
     async def store_vector(
         self, 
         user_id: str,
         content: str, 
         vector: np.ndarray,
-        context: Optional[str] = None
+        context: Optional[str] = None,
+        point_id: Optional[str] = None,
+        time: Optional[str] = None
     ) -> str:
         if self.client is None:
             raise RuntimeError("Клиент Qdrant не инициализирован")
         
         try:
-            point_id = str(uuid.uuid4())
-            
-            current_time = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
-            
-            payload = {
-                "user_id": user_id,
-                "content": content,
-                "time": current_time
-            }
-            
-            if context:
-                payload["context"] = context
-            
-            point = PointStruct(
-                id=point_id,
-                vector=vector.tolist(),
-                payload=payload
-            )
+            await self.refresh_projection()
+            point = self._build_point(user_id, content, vector, context, point_id, time)
+            point_id = point.id
             
-            self.client.upsert(
+            await self._call(
+                "upsert",
                 collection_name=self.collection_name,
                 points=[point]
             )
             
-            logger.info(f"Вектор сохранен с ID: {point_id} для пользователя: {user_id}")
+            hot_logger.info("Вектор сохранен с ID: %s для пользователя: %s", point_id, user_id)
             return point_id
         except Exception as e:
             logger.error(f"Ошибка при сохранении вектора: {e}")
             raise
 
+    async def store_vectors(
+        self,
+        items: List[Dict[str, Any]],
+        chunk_size: Optional[int] = None,
+        wait: bool = True
+    ) -> List[Tuple[Optional[str], Optional[str]]]:
+        if self.client is None:
+            raise RuntimeError("Клиент Qdrant не инициализирован")
+
+        chunk_size = chunk_size or self.upsert_chunk_size
+        results: List[Tuple[Optional[str], Optional[str]]] = []
+        await self.refresh_projection()
+
+        for start in range(0, len(items), chunk_size):
+            chunk = items[start:start + chunk_size]
+            points = [
+                self._build_point(
+                    user_id=item["user_id"],
+                    content=item["content"],
+                    vector=item["vector"],
+                    context=item.get("context"),
+                    point_id=item.get("id"),
+                    time=item.get("time")
+                )
+                for item in chunk
+            ]
+            metrics.observe_batch("qdrant.upsert", len(points))
+            try:
+                await self._call(
+                    "upsert",
+                    collection_name=self.collection_name,
+                    points=points,
+                    wait=wait
+                )
+                results.extend((point.id, None) for point in points)
+            except Exception as e:
+                logger.error(f"Ошибка при пакетном сохранении {len(points)} векторов: {e}")
+                results.extend((None, str(e)) for _ in points)
+
+        hot_logger.info("Пакетно сохранено %d из %d векторов", sum(1 for point_id, _ in results if point_id), len(items))
+        return results
+
+    async def existing_ids(self, point_ids: List[str]) -> set:
+        if self.client is None:
+            raise RuntimeError("Клиент Qdrant не инициализирован")
+        if not point_ids:
+            return set()
+
+        records = await self._call(
+            "retrieve",
+            collection_name=self.collection_name,
+            ids=point_ids,
+            with_payload=False,
+            with_vectors=False
+        )
+        return {str(record.id) for record in records}
+
+    async def touch_points(self, point_ids: List[str], wait: bool = True, time: Optional[str] = None):
+        if self.client is None:
+            raise RuntimeError("Клиент Qdrant не инициализирован")
+        if not point_ids:
+            return
+
+        time = time or self.current_time()
+        await self._call(
+            "set_payload",
+            collection_name=self.collection_name,
+            payload={"time": time, "timestamp": self.to_timestamp(time)},
+            points=point_ids,
+            wait=wait
+        )
+        hot_logger.info("Обновлено время у %d существующих точек", len(point_ids))
+
+    async def retrieve_points(self, point_ids: List[str], with_vectors: bool = False) -> List[Record]:
+        if self.client is None:
+            raise RuntimeError("Клиент Qdrant не инициализирован")
+
+        return self._unpack_vectors(await self._call(
+            "retrieve",
+            collection_name=self.collection_name,
+            ids=point_ids,
+            with_payload=True,
+            with_vectors=self._with_vectors(with_vectors)
+        ))
+
+    async def upsert_points(self, points: List[PointStruct], wait: bool = True):
+        if self.client is None:
+            raise RuntimeError("Клиент Qdrant не инициализирован")
+
+        await self.refresh_projection()
+        await self._call(
+            "upsert",
+            collection_name=self.collection_name,
+            points=[
+                point if isinstance(point.vector, dict) else PointStruct(
+                    id=point.id,
+                    vector=self._point_vector(point.vector),
+                    payload=point.payload
+                )
+                for point in points
+            ],
+            wait=wait
+        )
+
+    async def set_payload(self, point_ids: List[str], payload: Dict[str, Any], wait: bool = True):
+        if self.client is None:
+            raise RuntimeError("Клиент Qdrant не инициализирован")
+        if not point_ids:
+            return
+
+        await self._call(
+            "set_payload",
+            collection_name=self.collection_name,
+            payload=payload,
+            points=point_ids,
+            wait=wait
+        )
+
+    async def get_vector_size(self) -> int:
+        if self.client is None:
+            raise RuntimeError("Клиент Qdrant не инициализирован")
+
+        info = await self._call("get_collection", collection_name=self.collection_name)
+        return self._full_params(info).size
+
+    async def delete_points(self, point_ids: List[str], wait: bool = True):
+        if self.client is None:
+            raise RuntimeError("Клиент Qdrant не инициализирован")
+        if not point_ids:
+            return
+
+        await self._call(
+            "delete",
+            collection_name=self.collection_name,
+            points_selector=PointIdsList(points=point_ids),
+            wait=wait
+        )
+        logger.info(f"Удалено {len(point_ids)} точек")
+
+    async def iter_points(
+        self,
+        user_id: Optional[str] = None,
+        with_vectors: bool = False,
+        batch_size: int = 256,
+        with_payload: Union[bool, List[str]] = True
+    ) -> AsyncIterator[List[Record]]:
+        if self.client is None:
+            raise RuntimeError("Клиент Qdrant не инициализирован")
+
+        offset = None
+        while True:
+            records, offset = await self.scroll_page(user_id, batch_size, offset, with_vectors, with_payload)
+            if records:
+                yield records
+            if offset is None:
+                break
+
+    async def scroll_page(
+        self,
+        user_id: Optional[str] = None,
+        limit: int = 100,
+        offset: Optional[Union[str, int]] = None,
+        with_vectors: bool = False,
+        with_payload: Union[bool, List[str]] = True
+    ) -> Tuple[List[Record], Optional[Union[str, int]]]:
+        if self.client is None:
+            raise RuntimeError("Клиент Qdrant не инициализирован")
+
+        records, next_offset = await self._call(
+            "scroll",
+            collection_name=self.collection_name,
+            scroll_filter=self._user_filter(user_id) if user_id else None,
+            limit=limit,
+            offset=offset,
+            with_payload=with_payload,
+            with_vectors=self._with_vectors(with_vectors)
+        )
+        return self._unpack_vectors(records), next_offset
+
+    @staticmethod
+    def record_to_dict(record: Record, with_vectors: bool = False) -> Dict[str, Any]:
+        payload = record.payload or {}
+        item = {
+            "id": str(record.id),
+            "user_id": payload.get("user_id", ""),
+            "content": payload.get("content", ""),
+            "context": payload.get("context"),
+            "time": payload.get("time")
+        }
+        if with_vectors:
+            item["vector"] = record.vector
+        return item
+
+    @staticmethod
+    def _user_filter(user_id: str, time_from: Optional[int] = None, time_to: Optional[int] = None) -> Filter:
+        conditions = [
+            FieldCondition(
+                key="user_id",
+                match=MatchValue(value=user_id)
+            )
+        ]
+        if time_from is not None or time_to is not None:
+            conditions.append(FieldCondition(key="timestamp", range=Range(gte=time_from, lte=time_to)))
+        return Filter(must=conditions)
+
+    @staticmethod
+    def _missing_timestamp_filter() -> Filter:
+        return Filter(must=[IsEmptyCondition(is_empty=PayloadField(key="timestamp"))])
+
+    @staticmethod
+    def _missing_compact_filter() -> Filter:
+        return Filter(must_not=[HasVectorCondition(has_vector=COMPACT_VECTOR)])
+
+    @staticmethod
+    def _recency_formula(half_life_days: float, weight: float) -> FormulaQuery:
+        decay = ExpDecayExpression(
+            exp_decay=DecayParamsExpression(
+                x="timestamp",
+                target=int(time.time()),
+                scale=half_life_days * 86400,
+                midpoint=0.5
+            )
+        )
+        return FormulaQuery(
+            formula=MultExpression(mult=["$score", SumExpression(sum=[1.0 - weight, MultExpression(mult=[weight, decay])])]),
+            defaults={"timestamp": 0}
+        )
+
+    def _similarity_stage(self, vector: np.ndarray, query_filter: Filter, limit: int, min_score: float) -> Dict[str, Any]:
+        stage = {
+            "query": vector.tolist(),
+            "using": self.vector_name,
+            "filter": query_filter,
+            "params": self._search_params(),
+            "limit": limit,
+            "score_threshold": min_score
+        }
+        if self.compact_search:
+            stage["prefetch"] = Prefetch(
+                query=self.projection.project(vector).tolist(),
+                using=COMPACT_VECTOR,
+                filter=query_filter,
+                params=self._search_params(),
+                limit=max(min(limit * self.compact_candidates_factor, self.compact_candidates_max), limit)
+            )
+        return stage
+
+    def _query_request(self, query: Dict[str, Any]) -> QueryRequest:
+        query_filter = self._user_filter(query["user_id"], query.get("time_from"), query.get("time_to"))
+        limit = query.get("limit", 5)
+        min_score = query.get("min_score", 0.3)
+        if not query.get("recency_half_life_days"):
+            return QueryRequest(**self._similarity_stage(query["vector"], query_filter, limit, min_score), with_payload=True)
+        prefetch_limit = min(max(limit * self.recency_prefetch_factor, limit), self.recency_prefetch_max)
+        return QueryRequest(
+            prefetch=Prefetch(**self._similarity_stage(query["vector"], query_filter, prefetch_limit, min_score)),
+            query=self._recency_formula(query["recency_half_life_days"], query.get("recency_weight", 0.5)),
+            limit=limit,
+            with_payload=True
+        )
+
+    def _uses_query_api(self, query: Dict[str, Any]) -> bool:
+        if self.vector_name is not None:
+            return True
+        return any(query.get(key) is not None for key in ("time_from", "time_to", "recency_half_life_days"))
+
+    async def backfill_timestamps(self, batch_size: int = 256, dry_run: bool = False) -> Dict[str, int]:
+        if self.client is None:
+            raise RuntimeError("Клиент Qdrant не инициализирован")
+
+        stats = {"scanned": 0, "updated": 0, "unparsed": 0}
+        offset = None
+        while True:
+            records, offset = await self._call(
+                "scroll",
+                collection_name=self.collection_name,
+                scroll_filter=self._missing_timestamp_filter(),
+                limit=batch_size,
+                offset=offset,
+                with_payload=["time"],
+                with_vectors=False
+            )
+            groups: Dict[int, List[Union[str, int]]] = {}
+            for record in records:
+                timestamp = self.to_timestamp((record.payload or {}).get("time"))
+                if timestamp is None:
+                    stats["unparsed"] += 1
+                else:
+                    groups.setdefault(timestamp, []).append(record.id)
+            stats["scanned"] += len(records)
+            stats["updated"] += sum(len(point_ids) for point_ids in groups.values())
+
+            if groups and not dry_run:
+                await self._call(
+                    "batch_update_points",
+                    collection_name=self.collection_name,
+                    update_operations=[
+                        SetPayloadOperation(set_payload=SetPayload(payload={"timestamp": timestamp}, points=point_ids))
+                        for timestamp, point_ids in groups.items()
+                    ],
+                    wait=True
+                )
+            if offset is None:
+                break
+        logger.info(
+            f"Заполнение timestamp: просмотрено {stats['scanned']}, обновлено {stats['updated']}, "
+            f"не удалось разобрать время у {stats['unparsed']}"
+        )
+        return stats
+
+    @staticmethod
+    def _to_result(scored_point: ScoredPoint) -> Dict[str, Any]:
+        return {
+            "score": scored_point.score,
+            "user_id": scored_point.payload.get("user_id", ""),
+            "content": scored_point.payload.get("content", ""),
+            "context": scored_point.payload.get("context"),
+            "time": scored_point.payload.get("time")
+        }
+
     async def search_similar(
         self, 
         user_id: str,
         query_vector: np.ndarray, 
         limit: int = 5, 
-        min_score: float = 0.3
+        min_score: float = 0.3,
+        time_from: Optional[int] = None,
+        time_to: Optional[int] = None,
+        recency_half_life_days: Optional[float] = None,
+        recency_weight: float = 0.5
     ) -> List[Dict[str, Any]]:
         if self.client is None:
             raise RuntimeError("Клиент Qdrant не инициализирован")
         
         try:
-            search_filter = Filter(
-                must=[
-                    FieldCondition(
-                        key="user_id",
-                        match=MatchValue(value=user_id)
-                    )
-                ]
-            )
-            
-            search_result = self.client.search(
-                collection_name=self.collection_name,
-                query_vector=query_vector.tolist(),
-                query_filter=search_filter,
-                limit=limit,
-                score_threshold=min_score
-            )
+            query = {
+                "user_id": user_id,
+                "vector": query_vector,
+                "limit": limit,
+                "min_score": min_score,
+                "time_from": time_from,
+                "time_to": time_to,
+                "recency_half_life_days": recency_half_life_days,
+                "recency_weight": recency_weight
+            }
+            await self.refresh_projection()
+            if self._uses_query_api(query):
+                request = self._query_request(query)
+                response = await self._call(
+                    "query_points",
+                    collection_name=self.collection_name,
+                    query=request.query,
+                    using=request.using,
+                    prefetch=request.prefetch,
+                    query_filter=request.filter,
+                    search_params=request.params,
+                    limit=request.limit,
+                    score_threshold=request.score_threshold,
+                    with_payload=True
+                )
+                search_result = response.points
+            else:
+                search_result = await self._call(
+                    "search",
+                    collection_name=self.collection_name,
+                    query_vector=query_vector.tolist(),
+                    query_filter=self._user_filter(user_id),
+                    search_params=self._search_params(),
+                    limit=limit,
+                    score_threshold=min_score
+                )
             
-            results = []
-            for scored_point in search_result:
-                result = {
-                    "score": scored_point.score,
-                    "user_id": scored_point.payload.get("user_id", ""),
-                    "content": scored_point.payload.get("content", ""),
-                    "context": scored_point.payload.get("context"),
-                    "time": scored_point.payload.get("time")
-                }
-                results.append(result)
+            results = [self._to_result(scored_point) for scored_point in search_result]
             
-            logger.info(f"Найдено {len(results)} результатов для пользователя {user_id}")
+            hot_logger.info("Найдено %d результатов для пользователя %s", len(results), user_id)
             return results
         except Exception as e:
             logger.error(f"Ошибка при поиске: {e}")
             raise
+
+    async def search_similar_batch(
+        self,
+        queries: List[Dict[str, Any]]
+    ) -> List[List[Dict[str, Any]]]:
+        if self.client is None:
+            raise RuntimeError("Клиент Qdrant не инициализирован")
+
+        try:
+            await self.refresh_projection()
+            if any(self._uses_query_api(query) for query in queries):
+                metrics.observe_batch("qdrant.query_batch_points", len(queries))
+                responses = await self._call(
+                    "query_batch_points",
+                    collection_name=self.collection_name,
+                    requests=[self._query_request(query) for query in queries]
+                )
+                batch_result = [response.points for response in responses]
+            else:
+                requests = [
+                    SearchRequest(
+                        vector=query["vector"].tolist(),
+                        filter=self._user_filter(query["user_id"]),
+                        params=self._search_params(),
+                        limit=query.get("limit", 5),
+                        score_threshold=query.get("min_score", 0.3),
+                        with_payload=True
+                    )
+                    for query in queries
+                ]
+                metrics.observe_batch("qdrant.search_batch", len(requests))
+
+                batch_result = await self._call(
+                    "search_batch",
+                    collection_name=self.collection_name,
+                    requests=requests
+                )
+
+            results = [
+                [self._to_result(scored_point) for scored_point in search_result]
+                for search_result in batch_result
+            ]
+            hot_logger.info("Пакетный поиск: %d запросов, %d результатов", len(queries), sum(len(r) for r in results))
+            return results
+        except Exception as e:
+            logger.error(f"Ошибка при пакетном поиске: {e}")
+            raise
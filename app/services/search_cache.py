@@ -0,0 +1,134 @@
+import asyncio
+import itertools
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+logger = logging.getLogger(__name__)
+
+class SearchCache:
+
+    def __init__(self):
+        self.max_size = int(os.getenv("SEARCH_CACHE_SIZE", 10000))
+        self.ttl = float(os.getenv("SEARCH_CACHE_TTL", 30))
+        self.max_users = int(os.getenv("SEARCH_CACHE_MAX_USERS", 100000))
+        self.coalesce = os.getenv("SEARCH_COALESCE", "true").lower() == "true"
+        self.workers = int(os.getenv("WORKERS") or os.getenv("WEB_CONCURRENCY") or 1)
+        if self.workers > 1 and self.max_size > 0 and os.getenv("SEARCH_CACHE_MULTI_WORKER", "false").lower() != "true":
+            logger.warning(
+                f"Кэш результатов поиска отключен: {self.workers} воркеров не видят записи друг друга. "
+                f"Включить принудительно: SEARCH_CACHE_MULTI_WORKER=true"
+            )
+            self.max_size = 0
+        self._clock = itertools.count(1)
+        self._floor = 0
+        self._versions: "OrderedDict[str, int]" = OrderedDict()
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[int, float, Any]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, Hashable, int], asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.stale = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl > 0
+
+    def version(self, user_id: str) -> int:
+        return self._versions.get(user_id, self._floor)
+
+    def bump(self, user_id: str):
+        self._versions[user_id] = next(self._clock)
+        self._versions.move_to_end(user_id)
+        while len(self._versions) > self.max_users:
+            _, version = self._versions.popitem(last=False)
+            self._floor = max(self._floor, version)
+
+    def _get(self, user_id: str, key: Hashable, version: int) -> Tuple[bool, Any]:
+        entry = self._entries.get((user_id, key))
+        if entry is None:
+            return False, None
+        entry_version, expires_at, value = entry
+        if entry_version != version or expires_at < time.monotonic():
+            del self._entries[(user_id, key)]
+            self.stale += 1
+            return False, None
+        self._entries.move_to_end((user_id, key))
+        return True, value
+
+    def _put(self, user_id: str, key: Hashable, version: int, value: Any):
+        if self.version(user_id) != version:
+            return
+        self._entries[(user_id, key)] = (version, time.monotonic() + self.ttl, value)
+        self._entries.move_to_end((user_id, key))
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def _compute(self, user_id: str, key: Hashable, version: int, compute: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await compute()
+            if self.enabled:
+                self._put(user_id, key, version, value)
+            return value
+        finally:
+            self._inflight.pop((user_id, key, version), None)
+
+    async def get_or_compute(self, user_id: str, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        version = self.version(user_id)
+        if self.enabled:
+            found, value = self._get(user_id, key, version)
+            if found:
+                self.hits += 1
+                return value
+        self.misses += 1
+
+        if not self.coalesce:
+            return await self._compute(user_id, key, version, compute)
+
+        task = self._inflight.get((user_id, key, version))
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._compute(user_id, key, version, compute))
+            self._inflight[(user_id, key, version)] = task
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def clear(self):
+        self._entries.clear()
+        self._floor = next(self._clock)
+        self._versions.clear()
+
+    async def close(self):
+        tasks = list(self._inflight.values())
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._inflight.clear()
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "coalesce": self.coalesce,
+            "workers": self.workers,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "users": len(self._versions),
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "stale": self.stale,
+            "evictions": self.evictions
+        }
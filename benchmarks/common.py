@@ -0,0 +1,41 @@
+import json
+import os
+import time
+from typing import Dict, List, Any
+
+import numpy as np
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {"count": 0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    values = np.asarray(samples, dtype=np.float64) * 1000.0
+    return {
+        "count": int(values.size),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "max_ms": float(values.max())
+    }
+
+
+def print_report(title: str, rows: Dict[str, Dict[str, Any]]):
+    print(f"\n{title}")
+    print(f"{'операция':<28}{'n':>8}{'p50, мс':>12}{'p95, мс':>12}{'p99, мс':>12}{'max, мс':>12}")
+    for name, stats in rows.items():
+        print(
+            f"{name:<28}{stats['count']:>8}{stats['p50_ms']:>12.2f}"
+            f"{stats['p95_ms']:>12.2f}{stats['p99_ms']:>12.2f}{stats['max_ms']:>12.2f}"
+        )
+
+
+def save_results(path: str, name: str, results: Dict[str, Any]):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    payload = {
+        "benchmark": name,
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "results": results
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    print(f"\nРезультаты сохранены в {path}")
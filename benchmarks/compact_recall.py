@@ -0,0 +1,130 @@
+import argparse
+import asyncio
+import os
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from app.services.projection import Projection, normalize
+from app.services.qdrant_service import QdrantService
+from benchmarks.common import save_results
+
+
+async def load_vectors(args) -> Tuple[np.ndarray, np.ndarray]:
+    if not args.from_collection:
+        rng = np.random.default_rng(args.seed)
+        latent = rng.standard_normal((args.points, args.rank))
+        basis = rng.standard_normal((args.rank, args.dim)) * np.linspace(1.0, 0.1, args.rank)[:, None]
+        vectors = latent @ basis + rng.standard_normal((args.points, args.dim)) * args.noise
+        users = np.arange(args.points) % args.users
+        return normalize(vectors), users
+
+    source = QdrantService()
+    await source.connect()
+    vectors, users = [], []
+    try:
+        await source.load_layout()
+        async for records in source.iter_points(with_vectors=True, batch_size=512):
+            for record in records:
+                vectors.append(record.vector)
+                users.append((record.payload or {}).get("user_id", ""))
+            if len(vectors) >= args.points:
+                break
+    finally:
+        await source.close()
+    _, user_index = np.unique(np.asarray(users[:args.points]), return_inverse=True)
+    return normalize(np.asarray(vectors[:args.points], dtype=np.float32)), user_index
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def evaluate(
+    vectors: np.ndarray,
+    users: np.ndarray,
+    queries: List[Tuple[np.ndarray, int]],
+    projection: Projection,
+    k: int,
+    factor: int
+) -> Dict[str, float]:
+    compact = projection.project(vectors)
+    compact = compact / np.maximum(np.linalg.norm(compact, axis=1, keepdims=True), 1e-12)
+    compact_recalls, rescored_recalls = [], []
+    for query, user in queries:
+        scope = np.flatnonzero(users == user)
+        expected = set(scope[top_k(vectors[scope] @ query, k)].tolist())
+
+        compact_query = projection.project(query)
+        compact_query = compact_query / max(np.linalg.norm(compact_query), 1e-12)
+        compact_scores = compact[scope] @ compact_query
+        compact_recalls.append(len(expected & set(scope[top_k(compact_scores, k)].tolist())) / len(expected))
+
+        candidates = scope[top_k(compact_scores, k * factor)]
+        rescored = candidates[top_k(vectors[candidates] @ query, k)]
+        rescored_recalls.append(len(expected & set(rescored.tolist())) / len(expected))
+    return {
+        "explained_variance": projection.explained_variance,
+        "recall_compact": float(np.mean(compact_recalls)),
+        "recall_rescored": float(np.mean(rescored_recalls)),
+        "bytes_per_point": projection.dim * 4
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Recall@k компактных векторов (PCA) в зависимости от размерности")
+    parser.add_argument("--dims", type=int, nargs="+", default=[64, 128, 256, 384])
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--train", type=int, default=10000, help="векторов для обучения PCA")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--factor", type=int, default=int(os.getenv("QDRANT_COMPACT_CANDIDATES_FACTOR", 4)),
+                        help="кандидатов на пересчет по полным векторам: k * factor")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--rank", type=int, default=96, help="эффективная размерность синтетических данных")
+    parser.add_argument("--noise", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--from-collection", action="store_true",
+                        help="взять векторы из рабочей коллекции QDRANT_COLLECTION вместо синтетических")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    vectors, users = await load_vectors(args)
+    rng = np.random.default_rng(args.seed)
+    order = rng.permutation(len(vectors))
+    train = vectors[order[:min(args.train, len(vectors))]]
+    queries = [
+        (normalize(vectors[i] + rng.standard_normal(vectors.shape[1]).astype(np.float32) * 0.01), users[i])
+        for i in rng.choice(len(vectors), size=args.queries)
+    ]
+
+    print(f"\nКомпактные векторы: {len(vectors)} точек, {vectors.shape[1]} измерений, PCA по {len(train)}, k={args.k}, factor={args.factor}")
+    print(f"{'размерность':<14}{'дисперсия':>12}{'recall@k':>12}{'с пересчетом':>15}{'байт/точка':>13}")
+    print(f"{vectors.shape[1]:<14}{1.0:>12.3f}{1.0:>12.4f}{1.0:>15.4f}{vectors.shape[1] * 4:>13}")
+    results = {}
+    for dim in args.dims:
+        if dim >= vectors.shape[1]:
+            continue
+        projection = await asyncio.to_thread(Projection.fit, train, dim)
+        stats = await asyncio.to_thread(evaluate, vectors, users, queries, projection, args.k, args.factor)
+        results[str(dim)] = stats
+        print(
+            f"{dim:<14}{stats['explained_variance']:>12.3f}{stats['recall_compact']:>12.4f}"
+            f"{stats['recall_rescored']:>15.4f}{stats['bytes_per_point']:>13}"
+        )
+
+    if args.output:
+        save_results(args.output, "compact_recall", {
+            "points": len(vectors),
+            "source_dim": int(vectors.shape[1]),
+            "k": args.k,
+            "factor": args.factor,
+            "dims": results
+        })
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
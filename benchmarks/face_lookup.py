@@ -0,0 +1,80 @@
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from app.services.face_service import FaceService
+from app.services.face_store import FACE_STORES
+from benchmarks.common import percentiles, print_report, save_results
+
+FIRST_NAMES = ["анна", "иван", "мария", "петр", "ольга", "сергей", "елена", "дмитрий", "наталья", "алексей"]
+LAST_NAMES = ["иванов", "петров", "сидоров", "смирнов", "кузнецов", "попов", "васильев", "соколов", "морозов", "волков"]
+EXTRA = ["мама", "папа", "брат", "сестра", "коллега", "друг", "сосед", "начальник", "тренер", "врач"]
+
+
+def random_name(rng: random.Random) -> str:
+    parts = [rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)]
+    if rng.random() < 0.5:
+        parts.append(rng.choice(EXTRA))
+    parts.append(f"id{rng.randrange(100000)}")
+    return " ".join(parts)
+
+
+def legacy_find(faces, query: str, min_score: float):
+    best = None
+    best_score = 0.0
+    for face in faces:
+        score = FaceService.cosine_similarity(face["name"], query)
+        if score > best_score:
+            best_score = score
+            best = face
+    if best and best_score >= min_score:
+        return {"id": best["id"], "score": best_score}
+    return None
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Поиск лица по имени: линейный проход против индекса")
+    parser.add_argument("--faces", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--store", choices=FACE_STORES, default="memory")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    os.environ["FACE_STORE"] = args.store
+    os.environ["FACE_STORE_PATH"] = os.path.join(tempfile.mkdtemp(), "faces.db")
+    service = FaceService()
+    legacy_faces = []
+    for i in range(args.faces):
+        name = random_name(rng)
+        face_id = await service.add_face("bench_user", name, f"image-{i}")
+        legacy_faces.append({"id": face_id, "name": name, "image": f"image-{i}"})
+
+    queries = [rng.choice(legacy_faces)["name"] if rng.random() < 0.7 else random_name(rng) for _ in range(args.queries)]
+    queries += [" ".join(rng.choice(legacy_faces)["name"].split()[:2]) for _ in range(args.queries // 5)]
+
+    legacy_samples, indexed_samples, mismatches = [], [], 0
+    for query in queries:
+        started = time.perf_counter()
+        expected = legacy_find(legacy_faces, query, 0.7)
+        legacy_samples.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        found = await service.find_face("bench_user", query, min_score=0.7)
+        indexed_samples.append(time.perf_counter() - started)
+        mismatches += expected != (found and {"id": found["id"], "score": found["score"]})
+
+    rows = {"linear_scan": percentiles(legacy_samples), "inverted_index": percentiles(indexed_samples)}
+    print_report(f"find_face: {args.faces} лиц у пользователя, {len(queries)} запросов", rows)
+    print(f"Расхождений с линейным проходом: {mismatches}")
+
+    if args.output:
+        save_results(args.output, "face_lookup", {"faces": args.faces, "latency": rows, "mismatches": mismatches})
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.common import percentiles, print_report, save_results
+
+
+def _worker(index: int, faces: int, workers: int, db_path: str, blob_dir: str, barrier, results):
+    os.environ["FACE_STORE"] = "sqlite"
+    os.environ["FACE_STORE_PATH"] = db_path
+    os.environ["FACE_BLOB_DIR"] = blob_dir
+
+    import asyncio
+    from app.services.face_service import FaceService
+
+    async def run():
+        service = FaceService()
+        barrier.wait()
+        added, add_samples = [], []
+        for i in range(faces):
+            started = time.perf_counter()
+            face_id = await service.add_face("shared_user", f"worker{index} face{i}", f"image-{index}-{i}")
+            add_samples.append(time.perf_counter() - started)
+            added.append(face_id)
+        barrier.wait()
+
+        missing, find_samples = 0, []
+        for other in range(workers):
+            for i in range(0, faces, max(1, faces // 20)):
+                started = time.perf_counter()
+                found = await service.find_face("shared_user", f"worker{other} face{i}", min_score=0.99)
+                find_samples.append(time.perf_counter() - started)
+                if found is None or found["name"] != f"worker{other} face{i}":
+                    missing += 1
+        service.close()
+        return added, missing, add_samples, find_samples
+
+    results.put((index, *asyncio.run(run())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Параллельная запись и чтение лиц из нескольких процессов (SQLite)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--faces", type=int, default=200)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    ctx = mp.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "faces.db")
+        blob_dir = os.path.join(tmp, "blobs")
+        barrier = ctx.Barrier(args.workers)
+        results = ctx.Queue()
+        processes = [
+            ctx.Process(target=_worker, args=(i, args.faces, args.workers, db_path, blob_dir, barrier, results))
+            for i in range(args.workers)
+        ]
+        for process in processes:
+            process.start()
+        collected = [results.get(timeout=600) for _ in processes]
+        for process in processes:
+            process.join()
+
+        from app.services.face_store import SqliteFaceStore
+        store = SqliteFaceStore(db_path)
+        stored = store.count()
+        store.close()
+
+    ids = [face_id for _, added, _, _, _ in collected for face_id in added]
+    missing = sum(item[2] for item in collected)
+    expected = args.workers * args.faces
+    rows = {
+        "add_face": percentiles([s for item in collected for s in item[3]]),
+        "find_face": percentiles([s for item in collected for s in item[4]])
+    }
+    print_report(f"SQLite-хранилище лиц: {args.workers} процессов по {args.faces} лиц", rows)
+    print(f"Выдано id: {len(ids)}, уникальных: {len(set(ids))}, в базе: {stored}, ожидалось: {expected}")
+    print(f"Не найдено лиц, добавленных другими процессами: {missing}")
+
+    if args.output:
+        save_results(args.output, "face_store_concurrency", {
+            "workers": args.workers,
+            "faces": args.faces,
+            "ids": len(ids),
+            "unique_ids": len(set(ids)),
+            "stored": stored,
+            "missing": missing,
+            "latency": rows
+        })
+
+    ok = len(ids) == expected and len(set(ids)) == expected and stored == expected and missing == 0
+    print("OK" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,233 @@
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import subprocess
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+from benchmarks.common import percentiles, save_results
+
+OPERATIONS = ("store", "search", "add_face", "find_face")
+WORDS = (
+    "отпуск горы море брат сестра друг работа проект книга фильм борщ пицца кофе чай поездка "
+    "Токио Киото Москва Сочи собака кошка бег йога шахматы гитара концерт день рождения встреча "
+    "врач экзамен курс python алгоритм сортировка отчет дедлайн переезд квартира ремонт"
+).split()
+FIRST_NAMES = ["анна", "иван", "мария", "петр", "ольга", "сергей", "елена", "дмитрий"]
+LAST_NAMES = ["иванов", "петров", "сидоров", "смирнов", "кузнецов", "попов", "соколов", "волков"]
+
+
+def random_text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def random_name(rng: random.Random) -> str:
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} id{rng.randrange(100000)}"
+
+
+def random_image(rng: random.Random, size: int) -> str:
+    return base64.b64encode(b"\x89PNG\r\n\x1a\n" + rng.randbytes(size)).decode("ascii")
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return "unknown"
+
+
+def configure_local_env(args, directory: str):
+    os.environ.setdefault("QDRANT_LOCATION", ":memory:")
+    os.environ.setdefault("QDRANT_COLLECTION", "ltm_benchmark")
+    os.environ.setdefault("FACE_BLOB_DIR", os.path.join(directory, "blobs"))
+    os.environ.setdefault("FACE_STORE_PATH", os.path.join(directory, "faces.db"))
+    os.environ.setdefault("LOG_FILE", "")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    if not args.real_model:
+        os.environ["EMBEDDING_BACKEND"] = "fake"
+        os.environ["EMBEDDING_FAKE_DIM"] = str(args.fake_dim)
+        os.environ["EMBEDDING_FAKE_LATENCY_MS"] = str(args.fake_latency_ms)
+        os.environ.setdefault("EMBEDDING_WARMUP_LENGTHS", "")
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float):
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            response = await client.get("/ready")
+            if response.status_code == 200:
+                return response.json()
+        except httpx.TransportError:
+            pass
+        if time.perf_counter() > deadline:
+            raise RuntimeError(f"Сервис не стал готов за {timeout} с")
+        await asyncio.sleep(0.2)
+
+
+class Workload:
+
+    def __init__(self, seed: int, users: int, image_bytes: int):
+        self.rng = random.Random(seed)
+        self.users = users
+        self.image_bytes = image_bytes
+        self.face_names: Dict[str, List[str]] = {}
+
+    def user(self) -> str:
+        return f"bench_user_{self.rng.randrange(self.users)}"
+
+    def request(self, operation: str) -> Dict[str, Any]:
+        user_id = self.user()
+        if operation == "store":
+            return {"url": "/memory/store", "json": {"user_id": user_id, "content": random_text(self.rng, 12), "context": "benchmark"}}
+        if operation == "search":
+            return {"url": "/search", "json": {"user_id": user_id, "query": random_text(self.rng, 4), "limit": 5, "min_score": 0.1}}
+        if operation == "add_face":
+            name = random_name(self.rng)
+            self.face_names.setdefault(user_id, []).append(name)
+            return {"url": "/add_face", "json": {"user_id": user_id, "name": name, "image": random_image(self.rng, self.image_bytes)}}
+        names = self.face_names.get(user_id)
+        query = self.rng.choice(names) if names and self.rng.random() < 0.8 else random_name(self.rng)
+        return {"url": "/find_face", "json": {"user_id": user_id, "query": query}}
+
+
+async def preload(client: httpx.AsyncClient, workload: Workload, memories: int, faces: int, batch_size: int = 256):
+    for start in range(0, memories, batch_size):
+        items = [
+            {"user_id": workload.user(), "content": random_text(workload.rng, 12), "context": "preload"}
+            for _ in range(min(batch_size, memories - start))
+        ]
+        response = await client.post("/memory/store_batch", json={"items": items, "wait": True})
+        response.raise_for_status()
+    semaphore = asyncio.Semaphore(16)
+
+    async def add_face(request):
+        async with semaphore:
+            (await client.post(request["url"], json=request["json"])).raise_for_status()
+
+    await asyncio.gather(*(add_face(workload.request("add_face")) for _ in range(faces)))
+
+
+async def run_operation(client: httpx.AsyncClient, workload: Workload, operation: str, concurrency: int, requests: int):
+    pending = [workload.request(operation) for _ in range(requests)]
+    samples: List[float] = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while pending:
+            request = pending.pop()
+            started = time.perf_counter()
+            try:
+                response = await client.post(request["url"], json=request["json"])
+                response.raise_for_status()
+                samples.append(time.perf_counter() - started)
+            except Exception:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {**percentiles(samples), "errors": errors, "rps": len(samples) / elapsed if elapsed > 0 else 0.0}
+
+
+def print_table(title: str, rows: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]]):
+    print(f"\n{title}")
+    print(f"{'операция':<12}{'n':>7}{'ош.':>6}{'req/s':>10}{'p50, мс':>10}{'p95, мс':>10}{'p99, мс':>10}{'Δ req/s':>10}{'Δ p95':>9}")
+    for name, stats in rows.items():
+        delta_rps, delta_p95 = "", ""
+        previous = baseline.get(name)
+        if previous and previous.get("rps") and previous.get("p95_ms"):
+            delta_rps = f"{(stats['rps'] / previous['rps'] - 1) * 100:+.0f}%"
+            delta_p95 = f"{(stats['p95_ms'] / previous['p95_ms'] - 1) * 100:+.0f}%"
+        print(
+            f"{name:<12}{stats['count']:>7}{stats['errors']:>6}{stats['rps']:>10.1f}{stats['p50_ms']:>10.2f}"
+            f"{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}{delta_rps:>10}{delta_p95:>9}"
+        )
+
+
+async def run(args):
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = {
+                (scenario["collection_size"], scenario["concurrency"]): scenario["operations"]
+                for scenario in json.load(f)["results"]["scenarios"]
+            }
+
+    with tempfile.TemporaryDirectory() as directory:
+        lifespan = None
+        if args.base_url:
+            client = httpx.AsyncClient(base_url=args.base_url, timeout=120.0, limits=httpx.Limits(max_connections=max(args.concurrency) + 4))
+        else:
+            configure_local_env(args, directory)
+            from app.main import app
+            lifespan = app.router.lifespan_context(app)
+            await lifespan.__aenter__()
+            client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark", timeout=120.0)
+
+        try:
+            readiness = await wait_ready(client, args.ready_timeout)
+            workload = Workload(args.seed, args.users, args.image_bytes)
+            scenarios = []
+            loaded = 0
+            for size in sorted(args.sizes):
+                if size > loaded:
+                    started = time.perf_counter()
+                    await preload(client, workload, size - loaded, (size - loaded) // 10)
+                    print(f"Коллекция дополнена до {size} воспоминаний за {time.perf_counter() - started:.1f} с")
+                    loaded = size
+                for concurrency in args.concurrency:
+                    rows = {}
+                    for operation in args.operations:
+                        rows[operation] = await run_operation(client, workload, operation, concurrency, args.requests)
+                    print_table(
+                        f"Коллекция ~{size} воспоминаний, конкурентность {concurrency}",
+                        rows,
+                        baseline.get((size, concurrency), {})
+                    )
+                    scenarios.append({"collection_size": size, "concurrency": concurrency, "operations": rows})
+        finally:
+            await client.aclose()
+            if lifespan is not None:
+                await lifespan.__aexit__(None, None, None)
+
+    if args.output:
+        save_results(args.output, "load_test", {
+            "revision": git_revision(),
+            "target": args.base_url or "in-process",
+            "embedding": "real" if args.real_model or args.base_url else f"fake:{args.fake_dim}d/{args.fake_latency_ms}ms",
+            "seed": args.seed,
+            "requests": args.requests,
+            "users": args.users,
+            "startup": readiness.get("timings"),
+            "scenarios": scenarios
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест API: store/search/add_face/find_face")
+    parser.add_argument("--base-url", default=None, help="живой сервер; по умолчанию приложение запускается в процессе")
+    parser.add_argument("--real-model", action="store_true", help="использовать EMBEDDING_BACKEND из окружения вместо фейкового")
+    parser.add_argument("--fake-dim", type=int, default=1024)
+    parser.add_argument("--fake-latency-ms", type=float, default=0.0)
+    parser.add_argument("--operations", nargs="+", choices=OPERATIONS, default=list(OPERATIONS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[0, 1000, 10000])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--image-bytes", type=int, default=4096)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--ready-timeout", type=float, default=600.0)
+    parser.add_argument("--baseline", default=None, help="JSON предыдущего запуска для сравнения")
+    parser.add_argument("--output", default=None)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from app import logging_config
+from benchmarks.common import percentiles, print_report, save_results
+
+QUERY = "что я говорил про отпуск в горах прошлым летом и с кем собирался поехать " * 2
+CONTENT = "Пользователь рассказал, что летом планирует поехать в горы вместе с братом и двумя друзьями " * 3
+
+
+def simulate_request(memory_logger, embedding_logger, qdrant_logger, i: int):
+    memory_logger.info("Сохраняю в память для пользователя %s: %.100s...", f"user_{i % 50}", CONTENT)
+    embedding_logger.info("Кодирую документ с контекстом: %.50s...", CONTENT)
+    qdrant_logger.info("Вектор сохранен с ID: %s для пользователя: %s", f"{i:032x}", f"user_{i % 50}")
+    memory_logger.info("Память сохранена с ID: %s", f"{i:032x}")
+    memory_logger.info("Поиск в памяти пользователя %s: %.100s", f"user_{i % 50}", QUERY)
+    embedding_logger.info("Кодирую запрос: %.100s", QUERY)
+    qdrant_logger.info("Найдено %d результатов для пользователя %s", 5, f"user_{i % 50}")
+    memory_logger.info("Найдено %d воспоминаний для пользователя %s", 5, f"user_{i % 50}")
+
+
+def legacy_simulate_request(memory_logger, embedding_logger, qdrant_logger, i: int):
+    user_id = f"user_{i % 50}"
+    memory_logger.info(f"Сохраняю в память для пользователя {user_id}: {CONTENT[:100]}...")
+    embedding_logger.info(f"Кодирую документ с контекстом: {CONTENT[:50]}...")
+    qdrant_logger.info(f"Вектор сохранен с ID: {i:032x} для пользователя: {user_id}")
+    memory_logger.info(f"Память сохранена с ID: {i:032x}")
+    memory_logger.info(f"Поиск в памяти пользователя {user_id}: {QUERY}")
+    embedding_logger.info(f"Кодирую запрос: {QUERY}")
+    qdrant_logger.info(f"Найдено {5} результатов для пользователя {user_id}")
+    memory_logger.info(f"Найдено {5} воспоминаний для пользователя {user_id}")
+
+
+def reset_root():
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+
+
+def run_mode(mode: str, requests: int, directory: str):
+    reset_root()
+    log_file = os.path.join(directory, f"{mode}.log")
+    devnull = open(os.devnull, "w")
+
+    if mode == "sync_file":
+        logging.basicConfig(
+            level=logging.INFO,
+            format=logging_config.LOG_FORMAT,
+            handlers=[logging.FileHandler(log_file), logging.StreamHandler(devnull)],
+            force=True
+        )
+        names = ("app.services.memory_service", "app.services.embedding_service", "app.services.qdrant_service")
+        simulate = legacy_simulate_request
+    else:
+        os.environ["LOG_FILE"] = log_file
+        os.environ["LOG_HOT_SAMPLE_RATE"] = "1.0" if mode == "queue" else os.environ.get("BENCH_SAMPLE_RATE", "0.01")
+        logging_config.setup_logging()
+        for handler in logging_config._listener.handlers:
+            if isinstance(handler, logging.StreamHandler) and not isinstance(handler, logging.FileHandler):
+                handler.setStream(devnull)
+        names = ("app.services.memory_service.hot", "app.services.embedding_service.hot", "app.services.qdrant_service.hot")
+        simulate = simulate_request
+
+    loggers = [logging.getLogger(name) for name in names]
+    samples = []
+    for i in range(requests):
+        started = time.perf_counter()
+        simulate(*loggers, i)
+        samples.append(time.perf_counter() - started)
+
+    drain_started = time.perf_counter()
+    if mode == "sync_file":
+        reset_root()
+    else:
+        logging_config.shutdown_logging()
+        reset_root()
+    drain = time.perf_counter() - drain_started
+    devnull.close()
+    size = sum(
+        os.path.getsize(os.path.join(directory, name))
+        for name in os.listdir(directory)
+        if name == f"{mode}.log" or name.startswith(f"{mode}.log.")
+    )
+    return samples, drain, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Накладные расходы логирования на запрос")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--sample-rate", type=float, default=0.01)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+    os.environ["BENCH_SAMPLE_RATE"] = str(args.sample_rate)
+    os.environ["LOG_QUEUE_SIZE"] = str(args.requests * 8 + 1)
+
+    rows, details = {}, {}
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in ("sync_file", "queue", "queue_sampled"):
+            samples, drain, size = run_mode(mode, args.requests, directory)
+            rows[mode] = percentiles(samples)
+            details[mode] = {"drain_seconds": drain, "log_bytes": size}
+
+    print_report(f"Логирование: {args.requests} запросов по 8 INFO-строк (время в потоке запроса)", rows)
+    for mode, detail in details.items():
+        print(f"{mode}: записано {detail['log_bytes']} байт, дренаж очереди {detail['drain_seconds']:.3f} с")
+
+    if args.output:
+        save_results(args.output, "logging_overhead", {
+            "requests": args.requests,
+            "sample_rate": args.sample_rate,
+            "latency": rows,
+            "details": details
+        })
+
+
+if __name__ == "__main__":
+    main()
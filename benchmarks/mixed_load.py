@@ -0,0 +1,95 @@
+import argparse
+import asyncio
+import random
+import time
+from collections import defaultdict
+
+import httpx
+
+from benchmarks.common import percentiles, print_report, save_results
+
+QUERIES = ["как меня зовут", "мои предпочтения", "что я готовил", "куда я собираюсь поехать", "какую книгу я читал"]
+CONTENTS = [
+    "Изучил алгоритм быстрой сортировки и его временную сложность O(n log n)",
+    "Приготовил домашний борщ с говядиной и сметаной",
+    "Планирую поездку в Японию: Токио, Киото, гора Фудзи",
+    "Прочитал книгу 'Чистый код' Роберта Мартина"
+]
+
+
+async def run_worker(client: httpx.AsyncClient, deadline: float, samples, errors, user_count: int):
+    while time.perf_counter() < deadline:
+        user_id = f"bench_user_{random.randrange(user_count)}"
+        if random.random() < 0.3:
+            name = "store"
+            request = client.post("/memory/store", json={
+                "user_id": user_id,
+                "content": random.choice(CONTENTS),
+                "context": "benchmark"
+            })
+        else:
+            name = "search"
+            request = client.post("/search", json={
+                "user_id": user_id,
+                "query": random.choice(QUERIES),
+                "limit": 5,
+                "min_score": 0.3
+            })
+        started = time.perf_counter()
+        try:
+            response = await request
+            response.raise_for_status()
+            samples[name].append(time.perf_counter() - started)
+        except Exception:
+            errors[name] += 1
+
+
+async def run_health_probe(client: httpx.AsyncClient, deadline: float, samples, errors, interval: float):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            response = await client.get("/")
+            response.raise_for_status()
+            samples["health"].append(time.perf_counter() - started)
+        except Exception:
+            errors["health"] += 1
+        await asyncio.sleep(interval)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Смешанная нагрузка store/search с проверками здоровья")
+    parser.add_argument("--base-url", default="http://localhost:8006")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--health-interval", type=float, default=0.1)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    samples = defaultdict(list)
+    errors = defaultdict(int)
+    limits = httpx.Limits(max_connections=args.concurrency + 1)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60.0, limits=limits) as client:
+        deadline = time.perf_counter() + args.duration
+        tasks = [
+            run_worker(client, deadline, samples, errors, args.users)
+            for _ in range(args.concurrency)
+        ]
+        tasks.append(run_health_probe(client, deadline, samples, errors, args.health_interval))
+        await asyncio.gather(*tasks)
+
+    rows = {name: percentiles(values) for name, values in samples.items()}
+    print_report(f"Смешанная нагрузка: concurrency={args.concurrency}, {args.duration:.0f} с", rows)
+    if errors:
+        print(f"Ошибки: {dict(errors)}")
+    if args.output:
+        save_results(args.output, "mixed_load", {
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "latency": rows,
+            "errors": dict(errors)
+        })
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from app.services.embedding_backends import create_backend
+from benchmarks.common import save_results
+
+SAMPLE_TEXTS = [
+    "query: как меня зовут",
+    "query: мои предпочтения",
+    "query: what is my name",
+    "query: user preferences",
+    "passage: Изучил алгоритм быстрой сортировки и его временную сложность O(n log n) context: программирование",
+    "passage: Приготовил домашний борщ с говядиной и сметаной context: кулинария",
+    "passage: Планирую поездку в Японию: Токио, Киото, гора Фудзи context: путешествия",
+    "passage: Прочитал книгу 'Чистый код' Роберта Мартина context: программирование",
+    "passage: Научился готовить итальянскую пасту карбонара",
+    "passage: песик помылся context: песик",
+    "passage: " + "Длинный документ для проверки усечения последовательности. " * 80
+]
+
+
+def load_texts(path: str) -> list:
+    if not path:
+        return SAMPLE_TEXTS
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def encode_timed(backend, texts):
+    started = time.perf_counter()
+    embeddings = backend.encode(texts)
+    return embeddings, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка расхождения ONNX-бэкендов с эталонным torch")
+    parser.add_argument("--model", default=os.getenv("EMBEDDING_MODEL", "intfloat/multilingual-e5-large"))
+    parser.add_argument("--texts", default=None, help="файл с текстами (по одному на строку, с префиксами query:/passage:)")
+    parser.add_argument("--max-drift-onnx", type=float, default=1e-4, help="допустимое 1 - cos для onnx")
+    parser.add_argument("--max-drift-int8", type=float, default=0.03, help="допустимое 1 - cos для onnx-int8")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    texts = load_texts(args.texts)
+    reference, reference_time = encode_timed(create_backend("torch", args.model).load(), texts)
+    results = {"torch": {"vector_size": int(reference.shape[1]), "seconds": reference_time}}
+    limits = {"onnx": args.max_drift_onnx, "onnx-int8": args.max_drift_int8}
+    failed = False
+
+    for name, limit in limits.items():
+        embeddings, seconds = encode_timed(create_backend(name, args.model).load(), texts)
+        cosine = np.sum(
+            (reference / np.linalg.norm(reference, axis=1, keepdims=True))
+            * (embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)),
+            axis=1
+        )
+        drift = 1.0 - cosine
+        ok = embeddings.shape == reference.shape and float(drift.max()) <= limit
+        failed = failed or not ok
+        results[name] = {
+            "vector_size": int(embeddings.shape[1]),
+            "seconds": seconds,
+            "max_drift": float(drift.max()),
+            "mean_drift": float(drift.mean()),
+            "limit": limit,
+            "ok": ok
+        }
+
+    print(f"\n{'бэкенд':<12}{'размер':>8}{'время, с':>10}{'max 1-cos':>12}{'mean 1-cos':>12}{'статус':>8}")
+    for name, stats in results.items():
+        status = "" if name == "torch" else ("OK" if stats["ok"] else "FAIL")
+        print(
+            f"{name:<12}{stats['vector_size']:>8}{stats['seconds']:>10.3f}"
+            f"{stats.get('max_drift', 0.0):>12.2e}{stats.get('mean_drift', 0.0):>12.2e}{status:>8}"
+        )
+
+    if args.output:
+        save_results(args.output, "onnx_parity", {"model": args.model, "texts": len(texts), "backends": results})
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
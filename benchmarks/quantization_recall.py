@@ -0,0 +1,119 @@
+import argparse
+import asyncio
+import os
+import random
+import time
+
+import numpy as np
+from qdrant_client.http.models import SearchParams
+
+from app.services.qdrant_service import QdrantService
+from benchmarks.common import percentiles, print_report, save_results
+
+MODES = [
+    ("float32", "none", "false"),
+    ("scalar_int8", "scalar", "true"),
+    ("binary", "binary", "true")
+]
+
+
+async def load_vectors(args) -> np.ndarray:
+    if not args.from_collection:
+        vectors = np.random.standard_normal((args.points, args.dim)).astype(np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    source = QdrantService()
+    await source.connect()
+    rows = []
+    try:
+        async for records in source.iter_points(with_vectors=True):
+            rows.extend(record.vector for record in records)
+            if len(rows) >= args.points:
+                break
+    finally:
+        await source.close()
+    return np.asarray(rows[:args.points], dtype=np.float32)
+
+
+async def run_mode(name: str, quantization: str, on_disk: str, vectors: np.ndarray, queries: np.ndarray, args):
+    os.environ["QDRANT_QUANTIZATION"] = quantization
+    os.environ["QDRANT_VECTORS_ON_DISK"] = on_disk
+    os.environ["QDRANT_SEARCH_OVERSAMPLING"] = str(args.oversampling)
+    service = QdrantService()
+    service.collection_name = f"bench_quantization_{name}"
+    await service.connect()
+    if await service.client.collection_exists(service.collection_name):
+        await service.client.delete_collection(service.collection_name)
+    await service.initialize(vectors.shape[1])
+
+    try:
+        items = [
+            {"user_id": f"user_{i % args.users}", "content": str(i), "vector": vector}
+            for i, vector in enumerate(vectors)
+        ]
+        await service.store_vectors(items, chunk_size=1024, wait=True)
+
+        recalls = []
+        samples = []
+        for vector in queries:
+            user_id = f"user_{random.randrange(args.users)}"
+            exact = await service.client.search(
+                collection_name=service.collection_name,
+                query_vector=vector.tolist(),
+                query_filter=service._user_filter(user_id),
+                search_params=SearchParams(exact=True),
+                limit=args.k
+            )
+            started = time.perf_counter()
+            found = await service.client.search(
+                collection_name=service.collection_name,
+                query_vector=vector.tolist(),
+                query_filter=service._user_filter(user_id),
+                search_params=service._search_params(),
+                limit=args.k
+            )
+            samples.append(time.perf_counter() - started)
+            expected = {point.id for point in exact}
+            if expected:
+                recalls.append(len(expected & {point.id for point in found}) / len(expected))
+
+        stats = percentiles(samples)
+        stats["recall"] = float(np.mean(recalls)) if recalls else 0.0
+        return stats
+    finally:
+        await service.client.delete_collection(service.collection_name)
+        await service.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Recall@k и задержка поиска для режимов квантования")
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--oversampling", type=float, default=2.0)
+    parser.add_argument("--from-collection", action="store_true",
+                        help="взять векторы из рабочей коллекции QDRANT_COLLECTION вместо случайных")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    vectors = await load_vectors(args)
+    queries = vectors[np.random.choice(len(vectors), size=args.queries)]
+    queries = queries + np.random.standard_normal(queries.shape).astype(np.float32) * 0.01
+
+    results = {}
+    for name, quantization, on_disk in MODES:
+        results[name] = await run_mode(name, quantization, on_disk, vectors, queries, args)
+
+    print_report(f"Квантование: {len(vectors)} векторов, k={args.k}, oversampling={args.oversampling}", results)
+    print(f"\n{'режим':<28}{'recall@k':>10}")
+    for name, stats in results.items():
+        print(f"{name:<28}{stats['recall']:>10.4f}")
+
+    if args.output:
+        save_results(args.output, "quantization_recall", {"points": len(vectors), "k": args.k, "modes": results})
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+import argparse
+import asyncio
+import random
+import time
+from typing import List
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.models.schemas import MemoryResponse
+from app.services.memory_service import MemoryService
+from benchmarks.common import percentiles, print_report, save_results
+
+WORDS = "отпуск горы море брат друг работа проект книга фильм борщ кофе поездка Токио собака йога гитара".split()
+
+
+def make_results(rng: random.Random, limit: int):
+    return [
+        {
+            "score": rng.uniform(0.3, 0.95),
+            "user_id": "bench_user",
+            "content": " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 40))),
+            "context": "benchmark" if rng.random() < 0.5 else None,
+            "time": "2024-05-01 12:00:00"
+        }
+        for _ in range(limit)
+    ]
+
+
+async def legacy_render(field, results) -> bytes:
+    memories = MemoryService._to_memory_responses(results)
+    content = await serialize_response(field=field, response_content=memories, is_coroutine=True)
+    return JSONResponse(content).body
+
+
+async def fast_render(field, results) -> bytes:
+    return ORJSONResponse(MemoryService._to_memory_rows(results)).body
+
+
+async def measure(render, field, payloads, iterations: int) -> List[float]:
+    samples = []
+    for i in range(iterations):
+        results = payloads[i % len(payloads)]
+        started = time.perf_counter()
+        await render(field, results)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Сериализация ответа /search: pydantic + json против orjson")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    payloads = [make_results(rng, args.limit) for _ in range(32)]
+    field = create_response_field(name="Response_search_memories_search_post", type_=List[MemoryResponse])
+
+    legacy_body = await legacy_render(field, payloads[0])
+    fast_body = await fast_render(field, payloads[0])
+
+    rows = {
+        "pydantic_x2_json": percentiles(await measure(legacy_render, field, payloads, args.iterations)),
+        "validate_once_orjson": percentiles(await measure(fast_render, field, payloads, args.iterations))
+    }
+    print_report(f"Сериализация ответа с {args.limit} воспоминаниями, {args.iterations} итераций", rows)
+    print(f"Размер тела: {len(legacy_body)} -> {len(fast_body)} байт")
+    speedup = rows["pydantic_x2_json"]["p50_ms"] / rows["validate_once_orjson"]["p50_ms"]
+    print(f"Ускорение по p50: x{speedup:.1f}")
+
+    if args.output:
+        save_results(args.output, "serialization", {
+            "limit": args.limit,
+            "latency": rows,
+            "body_bytes": {"legacy": len(legacy_body), "fast": len(fast_body)},
+            "speedup_p50": speedup
+        })
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,80 @@
+import argparse
+import asyncio
+import os
+import random
+import time
+
+import numpy as np
+
+from app.services.qdrant_service import QdrantService
+from benchmarks.common import percentiles, print_report, save_results
+
+
+def random_vectors(count: int, dim: int) -> np.ndarray:
+    vectors = np.random.standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+async def fill(service: QdrantService, users: range, per_user: int, dim: int):
+    items = [
+        {"user_id": f"user_{u}", "content": f"memory {u}-{i}", "vector": vector}
+        for u in users
+        for i, vector in enumerate(random_vectors(per_user, dim))
+    ]
+    for start in range(0, len(items), 2048):
+        await service.store_vectors(items[start:start + 2048], wait=True)
+
+
+async def measure(service: QdrantService, user_count: int, dim: int, queries: int):
+    samples = []
+    for vector in random_vectors(queries, dim):
+        user_id = f"user_{random.randrange(user_count)}"
+        started = time.perf_counter()
+        await service.search_similar(user_id, vector, limit=5, min_score=0.0)
+        samples.append(time.perf_counter() - started)
+    return percentiles(samples)
+
+
+async def run_mode(tenant_index: bool, args) -> dict:
+    os.environ["QDRANT_TENANT_INDEX"] = "true" if tenant_index else "false"
+    service = QdrantService()
+    service.collection_name = f"bench_tenants_{'indexed' if tenant_index else 'plain'}"
+    await service.connect()
+    if await service.client.collection_exists(service.collection_name):
+        await service.client.delete_collection(service.collection_name)
+    await service.initialize(args.dim)
+
+    rows = {}
+    loaded = 0
+    try:
+        for user_count in args.users:
+            await fill(service, range(loaded, user_count), args.per_user, args.dim)
+            loaded = user_count
+            rows[f"users={user_count}"] = await measure(service, user_count, args.dim, args.queries)
+    finally:
+        await service.client.delete_collection(service.collection_name)
+        await service.close()
+    return rows
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Задержка фильтрованного поиска в зависимости от числа пользователей")
+    parser.add_argument("--users", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--per-user", type=int, default=50)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    results = {}
+    for tenant_index in (False, True):
+        mode = "tenant_index" if tenant_index else "no_index"
+        results[mode] = await run_mode(tenant_index, args)
+        print_report(f"Поиск с фильтром по user_id ({mode}, {args.per_user} точек на пользователя)", results[mode])
+
+    if args.output:
+        save_results(args.output, "tenant_scaling", {"per_user": args.per_user, "dim": args.dim, "latency": results})
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+import argparse
+import asyncio
+import os
+import time
+
+import numpy as np
+
+from app.services.qdrant_service import QdrantService
+from benchmarks.common import percentiles, print_report, save_results
+
+
+async def timed_concurrently(make_call, count: int, concurrency: int):
+    samples = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            started = time.perf_counter()
+            await make_call(i)
+            samples.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(count)))
+    stats = percentiles(samples)
+    stats["ops_per_sec"] = count / (time.perf_counter() - started)
+    return stats
+
+
+async def run_transport(prefer_grpc: bool, args) -> dict:
+    os.environ["QDRANT_PREFER_GRPC"] = "true" if prefer_grpc else "false"
+    os.environ["QDRANT_POOL_SIZE"] = str(args.pool_size)
+    service = QdrantService()
+    service.collection_name = f"bench_transport_{'grpc' if prefer_grpc else 'rest'}"
+    await service.connect()
+    if await service.client.collection_exists(service.collection_name):
+        await service.client.delete_collection(service.collection_name)
+    await service.initialize(args.dim)
+
+    vectors = np.random.standard_normal((args.count, args.dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    try:
+        rows = {}
+        rows["store"] = await timed_concurrently(
+            lambda i: service.store_vector(f"user_{i % 10}", f"memory {i}", vectors[i]),
+            args.count, args.concurrency
+        )
+        batch = [
+            {"user_id": f"user_{i % 10}", "content": f"batch {i}", "vector": vectors[i]}
+            for i in range(args.batch)
+        ]
+        rows[f"store_batch[{args.batch}]"] = await timed_concurrently(
+            lambda i: service.store_vectors(batch, wait=True),
+            max(1, args.count // args.batch), args.concurrency
+        )
+        rows["search"] = await timed_concurrently(
+            lambda i: service.search_similar(f"user_{i % 10}", vectors[i], limit=5, min_score=0.0),
+            args.count, args.concurrency
+        )
+        return rows
+    finally:
+        await service.client.delete_collection(service.collection_name)
+        await service.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Сравнение REST и gRPC для сохранения и поиска")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--batch", type=int, default=256)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    results = {}
+    for prefer_grpc in (False, True):
+        name = "grpc" if prefer_grpc else "rest"
+        results[name] = await run_transport(prefer_grpc, args)
+        print_report(f"Транспорт {name.upper()} (пул {args.pool_size}, concurrency {args.concurrency})", results[name])
+        for operation, stats in results[name].items():
+            print(f"  {operation}: {stats['ops_per_sec']:.1f} оп/с")
+
+    if args.output:
+        save_results(args.output, "transport", {"dim": args.dim, "pool_size": args.pool_size, "transports": results})
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
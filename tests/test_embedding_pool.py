@@ -0,0 +1,53 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from app.services.embedding_backends import FakeBackend
+from app.services.embedding_pool import EmbeddingWorkerPool
+
+
+@pytest.fixture
+def fake_env(monkeypatch):
+    monkeypatch.setenv("EMBEDDING_FAKE_DIM", "32")
+    monkeypatch.setenv("EMBEDDING_FAKE_LATENCY_MS", "0")
+    monkeypatch.setenv("EMBEDDING_POOL_PIN_CPUS", "false")
+    monkeypatch.setenv("EMBEDDING_POOL_HEALTH_INTERVAL", "3600")
+
+
+def test_pool_encodes_with_fake_backend(fake_env):
+    pool = EmbeddingWorkerPool("fake", "fake-model", 2).load()
+    try:
+        texts = [f"passage: память номер {i}" for i in range(70)]
+        embeddings = pool.encode(texts)
+        expected = FakeBackend("fake-model").load().encode(texts)
+
+        assert pool.vector_size == 32
+        assert embeddings.shape == (70, 32)
+        assert np.allclose(embeddings, expected, atol=1e-6)
+        assert pool.encode("query: один").shape == (32,)
+        assert pool.get_stats()["alive"] == 2
+    finally:
+        pool.close()
+
+
+def test_pool_cleans_up_after_failed_start(fake_env, monkeypatch):
+    pool = EmbeddingWorkerPool("fake", "fake-model", 2)
+    started = []
+    start = EmbeddingWorkerPool._start
+
+    def failing_start(self, worker):
+        if worker.index == 1:
+            raise RuntimeError("worker 1 failed")
+        start(self, worker)
+        started.append((worker.process, worker.shm.name))
+
+    monkeypatch.setattr(EmbeddingWorkerPool, "_start", failing_start)
+    with pytest.raises(RuntimeError):
+        pool.load()
+
+    assert pool._workers == []
+    process, shm_name = started[0]
+    assert not process.is_alive()
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=shm_name)